@@ -2,6 +2,7 @@ from ring_signatures import *
 from ct import *
 from stealth import *
 from ringct import *
+from noncepool import *
 
 class RingCTToken:
     MyPrivateViewKey = 0
@@ -14,16 +15,21 @@ class RingCTToken:
     MyPendingUTXOPool = []
     MixinTxPool = []
 
+    noncePoolSize = 8
+
     debugPrintingEnabled = False
 
-    #def __init__(self):
+    def __init__(self):
+        #Precomputed signing nonces for each UTXO in MyUTXOPool, keyed by compressed public key
+        #Per instance: the nonces are secret and must not be shared between tokens
+        self.MyNoncePools = {}
 
     def GenerateNewStealthAddress(self):
         self.MyPrivateViewKey = getRandom()
         self.MyPrivateSpendKey = getRandom()
 
-        self.MyPublicViewKey = multiply(G1, self.MyPrivateViewKey)
-        self.MyPublicSpendKey = multiply(G1, self.MyPrivateSpendKey)
+        self.MyPublicViewKey = MultiplyG1(self.MyPrivateViewKey)
+        self.MyPublicSpendKey = MultiplyG1(self.MyPrivateSpendKey)
 
         if (self.debugPrintingEnabled):
             print()
@@ -37,8 +43,8 @@ class RingCTToken:
         self.MyPrivateViewKey = privViewKey
         self.MyPrivateSpendKey = privSpendKey
 
-        self.MyPublicViewKey = multiply(G1, self.MyPrivateViewKey)
-        self.MyPublicSpendKey = multiply(G1, self.MyPrivateSpendKey)
+        self.MyPublicViewKey = MultiplyG1(self.MyPrivateViewKey)
+        self.MyPublicSpendKey = MultiplyG1(self.MyPrivateSpendKey)
 
         if (self.debugPrintingEnabled):
             print()
@@ -129,7 +135,7 @@ class RingCTToken:
             print("\nNew Mixin Transactions (" + str(count) + ") Generated:")
         
         for i in range(0, len(count)):
-            stealth_tx = StealthTransaction(multiply(G1, getRandom()), multiply(G1, getRandom()), multiply(G1, 1*10**14), PCAESMessage.Encrypt(getRandom(), getRandom(), getRandom()))
+            stealth_tx = StealthTransaction(MultiplyG1(getRandom()), MultiplyG1(getRandom()), MultiplyG1(1*10**14), PCAESMessage.Encrypt(getRandom(), getRandom(), getRandom()))
                 
             self.MixinTxPool = self.MixinTxPool + [stealth_tx]
 
@@ -138,6 +144,30 @@ class RingCTToken:
                 stealth_tx.Print()
                 print()
 
+    #Nonce Pools
+    #Fills a NoncePool for every UTXO in MyUTXOPool from background threads, so that later spends
+    #start their rings from precomputed nonces (call while idle, e.g. after importing UTXOs)
+    def FillNoncePools(self):
+        pools = {}
+        for utxo in self.MyUTXOPool:
+            key = CompressPoint(utxo.pub_key)
+            pool = self.MyNoncePools.get(key)
+            if (pool == None):
+                pool = NoncePool(utxo.pub_key, self.noncePoolSize)
+
+            pool.FillBackground()
+            pools[key] = pool
+
+        #Discard nonces of UTXOs that are no longer ours
+        for key in self.MyNoncePools:
+            if (key not in pools):
+                self.MyNoncePools[key].Clear()
+
+        self.MyNoncePools = pools
+
+    def GetNoncePool(self, utxo):
+        return self.MyNoncePools.get(CompressPoint(utxo.pub_key))
+
     def MarkUTXOAsSpent(self, indices):
         if (type(indices) != list):
             indices = [indices]
@@ -146,6 +176,11 @@ class RingCTToken:
         for i in range(0, len(indices)):
             index = indices[i]-i
             self.MixinTxPool = self.MixinTxPool + [self.MyUTXOPool[index]]
+
+            key = CompressPoint(self.MyUTXOPool[index].pub_key)
+            pool = self.MyNoncePools.pop(key, None)
+            if (pool != None):
+                pool.Clear()
             self.MyUTXOPool = self.MyUTXOPool[:index] + self.MyUTXOPool[index+1:]
 
             if(self.debugPrintingEnabled):
@@ -223,6 +258,11 @@ class RingCTToken:
                 
             in_xk[i] = in_utxos[i].GetPrivKey(self.MyPrivateViewKey, self.MyPrivateSpendKey)
 
+            #Reuse the UTXO's public key and commitment for signing
+            in_commitment = in_utxos[i].c_value if in_utxos[i].isEncrypted() else None
+            in_xk[i] = SigningContext(in_xk[i], P=in_utxos[i].pub_key, v=in_values[i], bf=in_bfs[i], commitment=in_commitment,
+                                      noncePool=self.GetNoncePool(in_utxos[i]))
+
         #Pick random mixin transactions from spent utxos, unknown utxos, and unspent utxos
         rem_utxo_indices = list(set(range(0, len(self.MyUTXOPool))) - set(UTXOindices))
             
@@ -242,7 +282,7 @@ class RingCTToken:
 
             #If Mixin TX is not encrypted, need to generate commitment to it: v*H
             if (not mixin_tx[i].isEncrypted()):
-                mixin_tx[i].c_value = multiply(H, mixin_tx[i].c_value)
+                mixin_tx[i].c_value = MultiplyH(mixin_tx[i].c_value)
 
         #Generate output transactions
         total_out_value = 0
@@ -335,6 +375,11 @@ class RingCTToken:
                                              
             in_xk[i] = in_utxos[i].GetPrivKey(self.MyPrivateViewKey, self.MyPrivateSpendKey)
 
+            #Reuse the UTXO's public key and commitment for signing
+            in_commitment = in_utxos[i].c_value if in_utxos[i].isEncrypted() else None
+            in_xk[i] = SigningContext(in_xk[i], P=in_utxos[i].pub_key, v=in_values[i], bf=in_bfs[i], commitment=in_commitment,
+                                      noncePool=self.GetNoncePool(in_utxos[i]))
+
         #Pick random mixin transactions from spent utxos, unknown utxos, and unspent utxos
         rem_utxo_indices = list(set(range(0, len(self.MyUTXOPool))) - set(UTXOindices))
             
@@ -354,7 +399,7 @@ class RingCTToken:
 
             #If Mixin TX is not encrypted, need to generate commitment to it: v*H
             if (not mixin_tx[i].isEncrypted()):
-                mixin_tx[i].c_value = multiply(H, mixin_tx[i].c_value)
+                mixin_tx[i].c_value = MultiplyH(mixin_tx[i].c_value)
 
         #Generate output transactions
         total_out_value = 0
@@ -0,0 +1,238 @@
+#Benchmarks for the elliptic curve / scalar arithmetic used by the RingCT code
+#Run "python benchmark.py" to time each big integer backend (see bigint.py) in its own process
+import os
+import sys
+import time
+import subprocess
+
+def TimeIt(f, N):
+    t = time.time()
+    for i in range(0, N):
+        f(i)
+    return (time.time() - t) / N
+
+#Times multiply(), MLSAG.Verify() and BulletProof.VerifyMulti() with the backend selected at import
+#Scalars are drawn from a deterministic stream (see util.SeedRandom) unless seed=None
+def Backend_TimeTrials(N=20, m=3, n=4, proofs=2, bits=16, seed=1):
+    import bigint
+    from util import getRandom, multiply, hash_to_point, G1, H, Ncurve, int_to_bytes32, SeedRandom
+    from ring_signatures import MLSAG
+    from bulletproof import BulletProof
+
+    print("Backend: " + bigint.backend)
+    SeedRandom(seed)
+    try:
+        r = getRandom(N)
+        P = hash_to_point(H)
+        t = TimeIt(lambda i: multiply(G1, r[i]), N)
+        print("multiply(G1, s) => " + str(t*1000) + "ms")
+        t = TimeIt(lambda i: multiply(P, r[i]), N)
+        print("multiply(P, s) => " + str(t*1000) + "ms")
+
+        xk = getRandom(m)
+        Pin = [multiply(G1, x) for x in getRandom(m*n)]
+        sig = MLSAG.Sign_GenRandom(m, int_to_bytes32(getRandom()), xk, [0]*m, Pin)
+        assert(sig.Verify())
+        t = TimeIt(lambda i: sig.Verify(), 3)
+        print("MLSAG.Verify() " + str(m) + "x" + str(n) + " => " + str(t*1000) + "ms")
+
+        bp = [BulletProof.Generate([5, 7], N=bits) for i in range(0, proofs)]
+        assert(BulletProof.VerifyMulti(bp))
+        t = TimeIt(lambda i: BulletProof.VerifyMulti(bp), 3)
+        print("BulletProof.VerifyMulti() " + str(proofs) + " proofs x 2 commitments x " + str(bits) + " bits => " + str(t*1000) + "ms")
+    finally:
+        #Back to os.urandom(), later signing must not use the seeded stream
+        SeedRandom(None)
+
+#Times multiexp() against one multiply() per term for n = 2, 8, 64 and 256 points
+def Multiexp_TimeTrials(sizes=(2, 8, 64, 256)):
+    from util import getRandom, multiply, multiexp, add, hash_to_point, NullPoint, H
+
+    P = [hash_to_point(H)]
+    for i in range(1, max(sizes)):
+        P.append(hash_to_point(P[i-1]))
+
+    for n in sizes:
+        s = getRandom(n)
+
+        t = time.time()
+        Q = NullPoint
+        for i in range(0, n):
+            Q = add(Q, multiply(P[i], s[i]))
+        t0 = time.time() - t
+
+        t = time.time()
+        multiexp(P[:n], s)
+        t1 = time.time() - t
+        print("n = " + str(n) + ": naive() => " + str(t0*1000) + "ms, multiexp() => " + str(t1*1000) + "ms")
+
+#Counts the FQ objects built by one 256-bit multiply() and times it
+def FQ_Churn_TimeTrials(N=50):
+    import optimized_field_elements as ofe
+    from util import getRandom, multiply, hash_to_point, H
+
+    P = hash_to_point(H)
+    s = (1 << 255) | getRandom()
+
+    #Count checked (FQ(n)) and unchecked (_fq(n)) constructions
+    count = [0]
+    init = ofe.FQ.__init__
+    new = ofe._new
+
+    def counting_init(self, n):
+        count[0] += 1
+        init(self, n)
+
+    def counting_new(cls):
+        count[0] += 1
+        return new(cls)
+
+    ofe.FQ.__init__ = counting_init
+    ofe._new = counting_new
+    try:
+        multiply(P, s)
+    finally:
+        ofe.FQ.__init__ = init
+        ofe._new = new
+
+    print("FQ objects per 256-bit multiply() => " + str(count[0]))
+    t = TimeIt(lambda i: multiply(P, s), N)
+    print("256-bit multiply() => " + str(t*1000) + "ms")
+
+#Signatures per second of MLSAG.Verify() (one at a time) and MLSAG.VerifyBatch() for m x n rings
+#Decoys are drawn from a pool of poolSize keys per signature, so rings share members as in a block
+def VerifyBatch_TimeTrials(count=16, shapes=((3, 4), (2, 11)), poolSize=4, seed=1):
+    import random
+    import concurrent.futures
+    from util import getRandomVector, MultiplyG1, int_to_bytes32, SeedRandom, ClearPrecomputedTables, ClearHashToPointCache
+    from ring_signatures import MLSAG
+
+    SeedRandom(seed)
+    try:
+        rng = random.Random(seed)
+
+        for (m, n) in shapes:
+            pool = [MultiplyG1(x) for x in getRandomVector(poolSize*count)]
+            sigs = []
+            for i in range(0, count):
+                Pin = [rng.choice(pool) for j in range(0, m*n)]
+                sigs.append(MLSAG.Sign_GenRandom(m, int_to_bytes32(i), getRandomVector(m), [0]*m, Pin))
+
+            with concurrent.futures.ProcessPoolExecutor() as executor:
+                trials = [("Verify()", lambda: [sig.Verify() for sig in sigs]),
+                          ("VerifyBatch()", lambda: MLSAG.VerifyBatch(sigs)),
+                          ("VerifyBatch(executor)", lambda: MLSAG.VerifyBatch(sigs, executor))]
+                for (name, f) in trials:
+                    ClearPrecomputedTables()
+                    ClearHashToPointCache()
+
+                    t = time.time()
+                    assert(all(f()))
+                    t = time.time() - t
+                    print(str(m) + "x" + str(n) + " " + name + " => " + str(count / t) + " signatures/s")
+    finally:
+        SeedRandom(None)
+
+#Sign() / Verify() time and signature size of MLSAG and CLSAG for one RingCT input (key and commitment
+#rows) and rings of n members.  Size is in 32-byte words: signature scalars and key images (x, y)
+def CLSAG_TimeTrials(ringSizes=(4, 11, 32), N=3, seed=1):
+    from util import getRandomVector, MultiplyG1, int_to_bytes32, SeedRandom
+    from ring_signatures import MLSAG, CLSAG
+
+    SeedRandom(seed)
+    try:
+        m = 2
+        for n in ringSizes:
+            xk = getRandomVector(m)
+            Pin = [MultiplyG1(x) for x in getRandomVector(m*n)]
+            msgHash = int_to_bytes32(n)
+
+            signers = [("MLSAG", lambda: MLSAG.Sign_GenRandom(m, msgHash, xk, [0]*m, Pin)),
+                       ("CLSAG", lambda: CLSAG.Sign_GenRandom(m, msgHash, xk, 0, Pin))]
+            for (name, sign) in signers:
+                sig = sign()
+                assert(sig.Verify())
+
+                t0 = TimeIt(lambda i: sign(), N)
+                t1 = TimeIt(lambda i: sig.Verify(), N)
+                words = len(sig.signature) + 2*len(sig.key_images)
+                print(name + " " + str(m) + "x" + str(n) + ": Sign() => " + str(t0*1000) + "ms, Verify() => " + str(t1*1000) + "ms, " + str(words) + " words")
+    finally:
+        SeedRandom(None)
+
+#Bytes held by obj and everything it references (shared objects such as NullPoint are not counted)
+def DeepSize(obj, shared=()):
+    import gc
+    import types
+
+    seen = set(id(x) for x in shared)
+    todo = [obj]
+    size = 0
+    while (len(todo) > 0):
+        x = todo.pop()
+        if (id(x) in seen or isinstance(x, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType))):
+            continue
+
+        seen.add(id(x))
+        size += sys.getsizeof(x)
+        todo += gc.get_referents(x)
+
+    return size
+
+#Memory per signature / proof object, as built by Sign() / Generate() and as decoded (see codec.py)
+def ObjectSize_Trials(shapes=((3, 4), (2, 11)), seed=1):
+    import io
+    import contextlib
+    from util import getRandom, getRandomVector, MultiplyG1, int_to_bytes32, SeedRandom, NullPoint
+    from ring_signatures import MSAG, MLSAG, CLSAG
+    from ct import PCRangeProof
+    from ringct import RingCTTest
+    from bulletproof import BulletProof
+    from codec import Encode, Decode
+
+    SeedRandom(seed)
+    try:
+        objects = []
+        for (m, n) in shapes:
+            xk = getRandomVector(m)
+            Pin = [MultiplyG1(x) for x in getRandomVector(m*n)]
+            objects += [("MSAG " + str(m) + "x" + str(n), MSAG.Sign_GenRandom(m, int_to_bytes32(1), xk, [0]*m, Pin)),
+                        ("MLSAG " + str(m) + "x" + str(n), MLSAG.Sign_GenRandom(m, int_to_bytes32(1), xk, [0]*m, Pin)),
+                        ("CLSAG " + str(m) + "x" + str(n), CLSAG.Sign_GenRandom(m, int_to_bytes32(1), xk, 0, Pin))]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            rct = RingCTTest(2, 3, 2)
+
+        objects += [("PCRangeProof 48 bits", PCRangeProof.Generate(48, 0, 1000, 0, getRandom())),
+                    ("BulletProof 2x64 bits", BulletProof.Generate([5, 7], N=64)),
+                    ("StealthTransaction", rct.output_transactions[0]),
+                    ("RingCT 2 inputs, ring of 3", rct)]
+
+        for (name, obj) in objects:
+            print(name + " => " + str(DeepSize(obj, [NullPoint])) + " bytes, decoded => " + str(DeepSize(Decode(Encode(obj)), [NullPoint])) + " bytes")
+    finally:
+        SeedRandom(None)
+
+#Runs Backend_TimeTrials() once per backend, each in a fresh interpreter
+def Backend_Compare(backends=("python", "gmpy2")):
+    for backend in backends:
+        env = dict(os.environ)
+        env["RINGCT_BIGINT_BACKEND"] = backend
+        subprocess.call([sys.executable, os.path.abspath(__file__), "backend"], env=env)
+        print()
+
+if __name__ == "__main__":
+    if (len(sys.argv) > 1 and sys.argv[1] == "backend"):
+        Backend_TimeTrials()
+    elif (len(sys.argv) > 1 and sys.argv[1] == "churn"):
+        FQ_Churn_TimeTrials()
+    elif (len(sys.argv) > 1 and sys.argv[1] == "multiexp"):
+        Multiexp_TimeTrials()
+    elif (len(sys.argv) > 1 and sys.argv[1] == "batch"):
+        VerifyBatch_TimeTrials()
+    elif (len(sys.argv) > 1 and sys.argv[1] == "clsag"):
+        CLSAG_TimeTrials()
+    elif (len(sys.argv) > 1 and sys.argv[1] == "size"):
+        ObjectSize_Trials()
+    else:
+        Backend_Compare()
@@ -0,0 +1,90 @@
+#Big integer arithmetic backend
+#Field (FQ) and scalar (Ncurve) arithmetic is routed through the functions below.
+#If gmpy2 is installed, mpz numbers are used (with gmpy2.powmod and gmpy2.invert),
+#otherwise everything falls back to plain Python integers.
+#The backend is selected once, at import time.  Set the environment variable
+#RINGCT_BIGINT_BACKEND=python to force the pure Python backend (e.g. for benchmarking).
+import os
+import sys
+
+backendRequested = os.environ.get("RINGCT_BIGINT_BACKEND", "gmpy2").lower()
+
+#Extended euclidean algorithm, used when pow(a, -1, n) is unavailable (Python < 3.8)
+def euclid_inv(a, n):
+    if a == 0:
+        return 0
+    lm, hm = 1, 0
+    low, high = a % n, n
+    while low > 1:
+        r = high // low
+        nm, new = hm - lm * r, high - low * r
+        lm, low, hm, high = nm, new, lm, low
+    return lm % n
+
+try:
+    if (backendRequested != "gmpy2"):
+        raise ImportError("gmpy2 backend not requested")
+
+    import gmpy2
+
+    backend = "gmpy2"
+    mpz = gmpy2.mpz
+    mpz_type = type(gmpy2.mpz(0))
+
+    def powmod(a, e, n):
+        return gmpy2.powmod(a, e, n)
+
+    #Returns 0 for a == 0 (mod n), matching prime_field_inv()
+    def invert(a, n):
+        a = a % n
+        if (a == 0):
+            return mpz(0)
+        return gmpy2.invert(a, n)
+
+except ImportError:
+    backend = "python"
+    mpz = int
+    mpz_type = int
+
+    def powmod(a, e, n):
+        return pow(a, e, n)
+
+    if (sys.version_info >= (3, 8)):
+        def invert(a, n):
+            a = a % n
+            if (a == 0):
+                return 0
+            return pow(a, -1, n)
+    else:
+        invert = euclid_inv
+
+#Backend integers (mpz) stay inside the field / scalar arithmetic, values handed to callers
+#(affine coordinates, compressed points, scalars) are converted to Python int
+def to_int(x):
+    return int(x)
+
+#Inverts every value of a mod n with a single inversion and ~3n multiplications (Montgomery's trick)
+#Zeros map to 0, matching invert()
+def batch_invert(a, n):
+    prefix = [1] * (len(a) + 1)
+    acc = 1
+    for i in range(0, len(a)):
+        if (a[i] % n != 0):
+            acc = acc * a[i] % n
+        prefix[i+1] = acc
+
+    inv = invert(acc, n)
+    out = [0] * len(a)
+    for i in reversed(range(0, len(a))):
+        if (a[i] % n == 0):
+            continue
+        out[i] = inv * prefix[i] % n
+        inv = inv * a[i] % n
+
+    return out
+
+#Integer types accepted as field / scalar values
+if sys.version_info.major == 2:
+    int_types = (int, long, mpz_type)  # noqa: F821
+else:
+    int_types = (int, mpz_type)
@@ -1,47 +1,30 @@
 from bulletproofutil import *
 
 class BulletProof:
-    total_commit = [NullPoint]
-    power10 = [0]
-    offset = [0]
-    value = [0]
-    bf = [0]
-    
-    V = [NullPoint]
-    A = NullPoint
-    S = NullPoint
-    T1 = NullPoint
-    T2 = NullPoint
-    taux = 0
-    mu = 0
-    L = [NullPoint]
-    R = [NullPoint]
-    a = 0
-    b = 0
-    t = 0
-    N = 0
+    __slots__ = ("total_commit", "power10", "offset", "value", "bf",
+                 "V", "A", "S", "T1", "T2", "taux", "mu", "L", "R", "a", "b", "t", "N")
     
     def __init__(self, total_commit, power10, offset, value, bf, V, A, S, T1, T2, taux, mu, L, R, a, b, t, N):
         #Commitment data
-        self.total_commit = total_commit
+        self.total_commit = PointVector(total_commit)
         self.power10 = power10
         self.offset = offset
-        self.value = value
-        self.bf = bf
+        self.value = [int(x) for x in value]
+        self.bf = [int(x) for x in bf]
 
         #Bulletproof properties
-        self.V = V
-        self.A = A
-        self.S = S
-        self.T1 = T1
-        self.T2 = T2
-        self.taux = taux
-        self.mu = mu
-        self.L = L
-        self.R = R
-        self.a = a
-        self.b = b
-        self.t = t
+        self.V = PointVector(V)
+        self.A = CompactPoint(A)
+        self.S = CompactPoint(S)
+        self.T1 = CompactPoint(T1)
+        self.T2 = CompactPoint(T2)
+        self.taux = int(taux)
+        self.mu = int(mu)
+        self.L = PointVector(L)
+        self.R = PointVector(R)
+        self.a = int(a)
+        self.b = int(b)
+        self.t = int(t)
         self.N = N
     
     def Generate(v, power10=None, offset=None, gamma=None, N=32):
@@ -55,7 +38,7 @@ class BulletProof:
             offset = [0]*len(v)
 
         if (gamma == None):
-            gamma = getRandom(len(v))    
+            gamma = getRandomVector(len(v))
 
         if (type(power10) != list):
             power10 = [power10]
@@ -82,9 +65,8 @@ class BulletProof:
             print("generating " + str(diffM) + " extra values")
             M = M + diffM
             
-        for i in range(0, diffM):
-            v = v + [getRandom() % (2**N)]
-            gamma = gamma + [getRandom()]
+        v = v + [r % (2**N) for r in getRandomVector(diffM)]
+        gamma = gamma + getRandomVector(diffM)
 
         #Make sure N is a power of 2
         logN = math.floor(math.log(N, 2))
@@ -93,16 +75,15 @@ class BulletProof:
         logMN = logM + logN
 
         #Make sure enough base points have been generated
-        assert(len(Gi) >= (M*N))
-        assert(len(Hi) >= (M*N))
+        (Gi, Hi) = GetGiHi(M*N)
 
         #Create V[]
-        V = [(FQ(0), FQ(0), FQ(0))]*M
+        V = [NullPoint]*M
         for i in range(0, M):
             if (v[i] == 0):
-                V[i] = multiply(G1, gamma[i])
+                V[i] = MultiplyG1(gamma[i])
             else:
-                V[i] = shamir([G1, H], [gamma[i], v[i]])
+                V[i] = CommitG1H(gamma[i], v[i])
 
         #Create A
         aL = [0]*(M*N)
@@ -115,16 +96,17 @@ class BulletProof:
                 aR[j*N+i] = sSub(aL[j*N+i], 1)
 
         alpha = getRandom()
-        A = add(pvExp(aL, aR), multiply(G1, alpha))
+        A = add(pvExp(aL, aR), MultiplyG1(alpha))
 
         #Create S
         sL = getRandom(M*N)
         sR = getRandom(M*N)
         rho = getRandom()
-        S = add(pvExp(sL, sR), multiply(G1, rho))
+        S = add(pvExp(sL, sR), MultiplyG1(rho))
 
         #Start hasher for Fiat-Shamir
 	#Hash V[], including array length
+        batch_normalize(V + [A, S])
         hasher = sha3.keccak_256(int_to_bytes32(M*2))
         for j in range(0, M):
             hasher = add_point_to_hasher(hasher, V[j])
@@ -167,10 +149,11 @@ class BulletProof:
 
         tau1 = getRandom()
         tau2 = getRandom()
-        T1 = shamir([G1, H], [tau1, t1])
-        T2 = shamir([G1, H], [tau2, t2])
+        T1 = CommitG1H(tau1, t1)
+        T2 = CommitG1H(tau2, t2)
 
         #Continue Fiat-Shamir
+        batch_normalize([T1, T2])
         hasher = add_point_to_hasher(hasher, T1)
         hasher = add_point_to_hasher(hasher, T2)
         x = bytes_to_int(hasher.digest()) % Ncurve
@@ -224,21 +207,23 @@ class BulletProof:
             cL = vDot(ap1, bp2)
             cR = vDot(bp1, ap2)
 
-            L[rounds] = add(pvExpCustom(gp2, hp1, ap1, bp2), multiply(H, sMul(cL, x_ip)))
-            R[rounds] = add(pvExpCustom(gp1, hp2, ap2, bp1), multiply(H, sMul(cR, x_ip)))
+            L[rounds] = add(pvExpCustom(gp2, hp1, ap1, bp2), MultiplyH(sMul(cL, x_ip)))
+            R[rounds] = add(pvExpCustom(gp1, hp2, ap2, bp1), MultiplyH(sMul(cR, x_ip)))
 
             #Update hasher for Fiat-Shamir
+            batch_normalize([L[rounds], R[rounds]])
             hasher = add_point_to_hasher(hasher, L[rounds])
             hasher = add_point_to_hasher(hasher, R[rounds])
             w[rounds] = bytes_to_int(hasher.digest()) % Ncurve
             hasher = sha3.keccak_256(int_to_bytes32(w[rounds]))
 
             #Update Gprime, Hprime, aprime, and bprime
-            Gprime = pvAdd(pvScale(gp1, sInv(w[rounds])), pvScale(gp2, w[rounds]))
-            Hprime = pvAdd(pvScale(hp1, w[rounds]), pvScale(hp2, sInv(w[rounds])))
+            winv = sInv(w[rounds])
+            Gprime = pvAdd(pvScale(gp1, winv), pvScale(gp2, w[rounds]))
+            Hprime = pvAdd(pvScale(hp1, w[rounds]), pvScale(hp2, winv))
 
-            aprime = vAdd(vScale(ap1, w[rounds]), vScale(ap2, sInv(w[rounds])))
-            bprime = vAdd(vScale(bp1, sInv(w[rounds])), vScale(bp2, w[rounds]))
+            aprime = vAdd(vScale(ap1, w[rounds]), vScale(ap2, winv))
+            bprime = vAdd(vScale(bp1, winv), vScale(bp2, w[rounds]))
 
             rounds = rounds + 1
 
@@ -285,16 +270,23 @@ class BulletProof:
                 maxLength = len(proofs[p].L)
 
         maxMN = 2**maxLength
+        (Gi, Hi) = GetGiHi(maxMN)
+
+        #Normalize the points of every proof for Fiat-Shamir hashing with a single inversion
+        points = []
+        for p in range(0, len(proofs)):
+            points += proofs[p].V + [proofs[p].A, proofs[p].S, proofs[p].T1, proofs[p].T2] + proofs[p].L + proofs[p].R
+        batch_normalize(points)
 
         #Initialize variables for checks
+        #Point terms are collected as (points, scalars) lists and summed with one multiexp() per stage
         y0 = 0              #taux
         y1 = 0              #t-(k+z+Sum(y^i))
-        Y2 = NullPoint           #z-V sum
-        Y3 = NullPoint           #x*T1
-        Y4 = NullPoint           #x^2*T2
-        Z0 = NullPoint           #A + xS
+        Y2 = []             #z-V sum, x*T1, x^2*T2 points
+        y2 = []             #z-V sum, x*T1, x^2*T2 scalars
         z1 = 0              #mu
-        Z2 = NullPoint           #Li / Ri sum
+        Z2 = []             #A + xS, Li / Ri sum points
+        z2 = []             #A + xS, Li / Ri sum scalars
         z3 = 0              #(t-ab)*x_ip
         z4 = [0]*maxMN      #g scalar sum
         z5 = [0]*maxMN      #h scalar sum
@@ -354,6 +346,8 @@ class BulletProof:
                 w[i] = bytes_to_int(hasher.digest()) % Ncurve
                 hasher = sha3.keccak_256(int_to_bytes32(w[i]))
 
+            winv = vInv(w)
+
             #Debug Printing
             if (False):
                 print()
@@ -374,11 +368,11 @@ class BulletProof:
                 for J in range(0, logMN):
                     j = logMN - J - 1
                     if (i & (1 << j) == 0):
-                        gScalar = sMul(gScalar, sInv(w[J]))
+                        gScalar = sMul(gScalar, winv[J])
                         hScalar = sMul(hScalar, w[J])
                     else:
                         gScalar = sMul(gScalar, w[J])
-                        hScalar = sMul(hScalar, sInv(w[J]))
+                        hScalar = sMul(hScalar, winv[J])
 
                 gScalar = sAdd(gScalar, z)
                 hScalar = sSub(hScalar, sMul(sAdd(sMul(z, vpy[i]), sMul(sPow(z, 2+(i//proof.N)), vp2[i%proof.N])), vpyi[i]))
@@ -392,56 +386,50 @@ class BulletProof:
             y0 = sAdd(y0, sMul(proof.taux, weight))
             y1 = sAdd(y1, sMul(sSub(proof.t, sAdd(k, sMul(z, vSum(vpy)))), weight))
 
-            temp = NullPoint
             for j in range(0, M):
-                temp = add(temp, multiply(proof.V[j], sPow(z, j+2)))
-                
-            Y2 = add(Y2, multiply(temp, weight))
-            Y3 = add(Y3, multiply(proof.T1, sMul(x, weight)))
-            Y4 = add(Y4, multiply(proof.T2, sMul(sSq(x), weight)))
+                Y2 += [proof.V[j]]
+                y2 += [sMul(sPow(z, j+2), weight)]
+
+            Y2 += [proof.T1, proof.T2]
+            y2 += [sMul(x, weight), sMul(sSq(x), weight)]
 
             #Stage 2 Checks
-            Z0 = add(Z0, multiply(add(proof.A, multiply(proof.S, x)), weight))
+            Z2 += [proof.A, proof.S]
+            z2 += [weight, sMul(x, weight)]
             z1 = sAdd(z1, sMul(proof.mu, weight))
 
-            temp = NullPoint
             for i in range(0, logMN):
-                temp = add(temp, shamir([proof.L[i], proof.R[i]], [sSq(w[i]), sSq(sInv(w[i]))]))
-            Z2 = add(Z2, multiply(temp, weight))
+                Z2 += [proof.L[i], proof.R[i]]
+                z2 += [sMul(sSq(w[i]), weight), sMul(sSq(winv[i]), weight)]
             z3 = sAdd(z3, sMul(sMul(sSub(proof.t, sMul(proof.a, proof.b)), x_ip), weight))
 
         #Perform all Checks
-        Check1 = shamir([G1, H], [y0, y1])
-        Check1 = add(Check1, neg(Y2))
-        Check1 = add(Check1, neg(Y3))
-        if (not eq(Check1, Y4)):
+        #y0*G1 + y1*H - Y2 == 0
+        Check1 = multiexp([G1, H] + Y2, [y0, y1] + [sNeg(s) for s in y2])
+        if (not is_inf(Check1)):
             print("Stage 1 Check Failed!")
             return False
 
-        Check2 = shamir([G1, H], [sNeg(z1), z3])
-        Check2 = add(Check2, Z0)
-
-        for i in range(0, maxMN):
-            Check2 = add(Check2, shamir([Gi[i], Hi[i]], [z4[i], z5[i]]))
+        #-z1*G1 + z3*H + z4*Gi + z5*Hi + Z2 == 0
+        Check2 = multiexp([G1, H] + Gi[:maxMN] + Hi[:maxMN] + Z2, [sNeg(z1), z3] + z4 + z5 + z2)
 
         #More Debug Printing
         if (False):
             print("y0: " + hex(y0))
             print("y1: " + hex(y1))
-            print("Y2: " + hex(CompressPoint(Y2)))
-            print("Y3: " + hex(CompressPoint(Y3)))
-            print("Y4: " + hex(CompressPoint(Y4)))
+            for i in range(0, len(Y2)):
+                print("Y2[" + str(i) + "]: " + hex(CompressPoint(Y2[i])) + " * " + hex(y2[i]))
             print()
-            print("Z0: " + hex(CompressPoint(Z0)))
             print("z1: " + hex(z1))
-            print("Z2: " + hex(CompressPoint(Z2)))
+            for i in range(0, len(Z2)):
+                print("Z2[" + str(i) + "]: " + hex(CompressPoint(Z2[i])) + " * " + hex(z2[i]))
             print("z3: " + hex(z3))
             for i in range(0, len(z4)):
                 print("z4[" + str(i) + "]: " + hex(z4[i]))
             for i in range(0, len(z5)):
                 print("z5[" + str(i) + "]: " + hex(z5[i]))            
         
-        if (not eq(Check2, neg(Z2))):
+        if (not is_inf(Check2)):
             print("Stage 2 Check Failed!")
             return False
         else:
@@ -585,17 +573,15 @@ class BulletProof:
                     print(", ", end="")
                 print(str(proofs[i].offset[j]), end="")
 
-#Single Bullet Proofs
-if (True):
-    N = 8  #bits
-    m = 4   #commitments per proof
+#Single Bullet Proof demo
+def BulletProof_Test(N=8, m=4):
+    import time
     print()
     print("Generating Single Bullet Proof with " + str(m) + " commitment(s) of " + str(N) + " bits...")
 
     #Generate proof(s)
-    import time
     t = time.time()
-    bp = BulletProof.Generate([4]*m, [0]*m, [0]*m, getRandom(m), N)
+    bp = BulletProof.Generate([4]*m, [0]*m, [0]*m, getRandomVector(m), N)
     t = time.time() - t
     bp.Print_MEW()
     
@@ -604,22 +590,20 @@ if (True):
 
     #Verify proofs(s)
     t = time.time()
-    bp.Verify()
+    result = bp.Verify()
     t = time.time() - t
     print("Verify time: " + str(t / m) + "s")
+    return result
 
-#Multiple Bullet Proofs
-if (False):
-    p = 2   #Number of Proofs
-    m = 2   #Commitments per Proof
-    bits = 8
+#Multiple Bullet Proofs demo
+def BulletProof_MultiTest(p=2, m=2, bits=8):
+    import time
     bp = [None]*p
 
     print()
     print("Generating " + str(p) + " Bullet Proof(s) each with " + str(m) + " commitment(s) of " + str(bits) + " bits...")
 
     #Generate Proof(s)
-    import time
     t = time.time()
     for i in range(0, p):
         bp[i] = BulletProof.Generate([5]*m, [17]*m, [0]*m, N=bits)
@@ -630,8 +614,11 @@ if (False):
 
     #Verify proofs(s)
     t = time.time()
-    BulletProof.VerifyMulti(bp)
+    result = BulletProof.VerifyMulti(bp)
     t = time.time() - t
     print("Verify time: " + str(t) + "s (" + str(t / (p * m)) + "s per commitment)")
     print()
-    
+    return result
+
+if __name__ == "__main__":
+    BulletProof_Test()
@@ -1,9 +1,13 @@
 from util import *
 from ring_signatures import *
+from bigint import mpz, invert, batch_invert, powmod, to_int
+import os
+import sha3
 
-Gi = []
-Hi = []
-pvExpShamirSize = 3     #When using Shamir's trick, perform multi exponentiation in batches of 2*pvExpShamirSize
+#Base points Gi / Hi are generated on first use (GetGiHi(N), or the module attributes Gi and Hi)
+basePointCount = 128    #Number of Gi / Hi points generated at least
+_Gi = []
+_Hi = []
 
 def GenBasePoints(N, Gi_old=None, Hi_old=None):
     #Get curve Generator Points    
@@ -29,7 +33,128 @@ def GenBasePoints(N, Gi_old=None, Hi_old=None):
 
     return (Gi, Hi)
 	
+#Base Point Cache File
+#Gi / Hi are stored compressed in a file, so they are loaded instead of re-hashing the chain.
+#Layout: magic | version (1 byte) | count (4 bytes) | keccak256(body) | body
+#        body = CompressPoint(Gi[i]) | CompressPoint(Hi[i]) for i = 0 ... count-1 (32 bytes each)
+#The file is user-writable, so its checksum only catches corruption: the longest prefix with a pinned
+#digest below must match it and only the links past that prefix are re-hashed on load (Gi / Hi with known
+#discrete logs would let forged proofs verify).  The file is rebuilt if any check fails.
+useBasePointCache = True
+basePointCacheFile = os.environ.get("RINGCT_BASEPOINT_CACHE",
+                                    os.path.join(os.path.expanduser("~"), ".cache", "ringct", "basepoints.bin"))
+_BASEPOINT_MAGIC = b"RCTGIHI"
+_BASEPOINT_VERSION = 1
+_BASEPOINT_HEADER = len(_BASEPOINT_MAGIC) + 1 + 4 + 32
+#keccak256 of the body bytes of the first count pairs, for count = basePointCount ... 64*64 (M*N for 64-bit proofs)
+_BASEPOINT_DIGESTS = {
+    128: bytes.fromhex("2c8baeb298c1af24e1792a363bb19187aefe09cd69f1dffe4c9410dd72dec06e"),
+    256: bytes.fromhex("88c5513d2e9b9f9082d3bc312092678d191b6437168060fbf5b55d47f2d4166e"),
+    512: bytes.fromhex("3fc04c7b94861f29e6aaa64e88c2dd5518e5450fa6705d1fc6bdbec7ec084c1b"),
+    1024: bytes.fromhex("ba5a3cae5670629c43164cc64b70d1c22871710d745b2248069bfbccd7ce201b"),
+    2048: bytes.fromhex("8ae92e1708fe247b6c155449d681f1020830589d1ee0b04fa4726496e67f5fde"),
+    4096: bytes.fromhex("4e244822940c93a52d348a7abba16d2ee355790f2eda892dafba3fba30e57041"),
+}
+
+#Returns (Gi, Hi) from the cache file (as LazyG1Point objects), ([], []) if missing or invalid
+def LoadBasePoints(path=None):
+    import mmap
+
+    if (path == None):
+        path = basePointCacheFile
+
+    try:
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                k = len(_BASEPOINT_MAGIC)
+                if (len(mm) < _BASEPOINT_HEADER): return ([], [])
+                if (mm[0:k] != _BASEPOINT_MAGIC): return ([], [])
+                if (mm[k] != _BASEPOINT_VERSION): return ([], [])
+
+                count = int.from_bytes(mm[k+1:k+5], "big")
+                checksum = mm[k+5:k+37]
+                if (len(mm) != _BASEPOINT_HEADER + 64*count): return ([], [])
+                pinned = [c for c in _BASEPOINT_DIGESTS if c <= count]
+                if (len(pinned) == 0): return ([], [])
+                pinned = max(pinned)
+
+                with memoryview(mm)[_BASEPOINT_HEADER:] as body:
+                    if (sha3.keccak_256(body).digest() != checksum): return ([], [])
+                    if (sha3.keccak_256(body[:64*pinned]).digest() != _BASEPOINT_DIGESTS[pinned]): return ([], [])
+
+                    Gi = [LazyG1Point(int.from_bytes(body[64*i:64*i+32], "big")) for i in range(0, count)]
+                    Hi = [LazyG1Point(int.from_bytes(body[64*i+32:64*i+64], "big")) for i in range(0, count)]
+    except (OSError, ValueError):
+        return ([], [])
+
+    #Pinned prefix is trusted, the rest of the chain is not
+    if (not CheckBasePointChain(Gi, Hi, pinned)):
+        return ([], [])
+
+    return (Gi, Hi)
+
+#Checks every link of the chain Gi[i] = hash_to_point(Hi[i-1]), Hi[i] = hash_to_point(Gi[i]) (Hi[-1] = H)
+#from index start on, Gi[start-1] / Hi[start-1] are taken as given
+def CheckBasePointChain(Gi, Hi, start=0):
+    count = min(len(Gi), len(Hi))
+    for i in range(start, count):
+        prev = H if i == 0 else Hi[i-1]
+        if (CompressPoint(hash_to_point(prev)) != CompressPoint(Gi[i])): return False
+        if (CompressPoint(hash_to_point(Gi[i])) != CompressPoint(Hi[i])): return False
+
+    return True
+
+#Writes Gi / Hi to the cache file (atomically replaced), returns False if it cannot be written
+def SaveBasePoints(Gi, Hi, path=None):
+    if (path == None):
+        path = basePointCacheFile
+
+    count = min(len(Gi), len(Hi))
+    body = bytearray(64*count)
+    for i in range(0, count):
+        body[64*i:64*i+32] = CompressPoint(Gi[i]).to_bytes(32, "big")
+        body[64*i+32:64*i+64] = CompressPoint(Hi[i]).to_bytes(32, "big")
+
+    header = _BASEPOINT_MAGIC + bytes([_BASEPOINT_VERSION]) + count.to_bytes(4, "big") + sha3.keccak_256(body).digest()
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp = path + "." + str(os.getpid()) + ".tmp"
+        with open(temp, "wb") as file:
+            file.write(header)
+            file.write(body)
+        os.replace(temp, path)
+    except OSError:
+        return False
+
+    return True
+
+#Returns (Gi, Hi) with at least N (and at least basePointCount) points each, extending them if needed
+def GetGiHi(N=0):
+    global _Gi, _Hi
+    N = max(N, basePointCount)
+    if (len(_Gi) < N or len(_Hi) < N):
+        if (useBasePointCache and len(_Gi) == 0):
+            (_Gi, _Hi) = LoadBasePoints()
+
+        if (len(_Gi) < N or len(_Hi) < N):
+            (_Gi, _Hi) = GenBasePoints(N, _Gi, _Hi)
+
+            if (useBasePointCache):
+                SaveBasePoints(_Gi, _Hi)
+
+    return (_Gi, _Hi)
+
+def __getattr__(name):
+    if (name == "Gi"):
+        return GetGiHi()[0]
+    elif (name == "Hi"):
+        return GetGiHi()[1]
+
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
 def SerializeBasePoints():
+	(Gi, Hi) = GetGiHi()
 	print("Gi:")
 	for i in range(0, len(Gi)):
 		print(point_to_str(Gi[i]) + ",")
@@ -40,6 +165,7 @@ def SerializeBasePoints():
 		print(point_to_str(Hi[i]) + ",")
 
 def CheckBasePoints():
+    (Gi, Hi) = GetGiHi()
     for i in range(0, len(Gi)):
         if (is_on_curve(Gi[i], 3)):
             print("Gi[" + str(i) + "] passes!")
@@ -52,47 +178,45 @@ def CheckBasePoints():
         else:
             print("Hi[" + str(i) + "] fails!")		
 
+#Scalar (mod Ncurve) arithmetic, runs on the bigint backend (gmpy2 mpz when available) and returns
+#Python ints
+_Ncurve = mpz(Ncurve)
+
 def sNeg(a):
-    return (Ncurve - (a % Ncurve)) % Ncurve
+    return to_int((_Ncurve - (a % _Ncurve)) % _Ncurve)
 
 def sAdd(a, b):
-    return (a + b) % Ncurve
+    return to_int((a + b) % _Ncurve)
 
 def sSub(a, b):
-    return sAdd(a, sNeg(b))
+    return to_int((a - b) % _Ncurve)
 
 def sMul(a, b):
-    return (a * b) % Ncurve
+    return to_int((a * b) % _Ncurve)
 
 def sSq(a):
     return sMul(a, a)
 
 def sPow(a, p):
-    out = a
-    for i in range(1, p):
-         out = sMul(out, a)
-         
-    return out
+    return to_int(powmod(a, p, _Ncurve))
 
 def sInv(a):
-    a = a % Ncurve
+    a = a % _Ncurve
     assert(a > 0)
 
-    t1 = 0
-    t2 = 1
-    r1 = Ncurve
-    r2 = a
-    q = 0
-    while (r2 != 0):
-        q = r1 // r2
-        (t1, t2, r1, r2) = (t2, t1 - q*t2, r2, r1 - q*r2)
-
-    if (t1 < 0):
-        t1 = t1 % Ncurve
+    t1 = to_int(invert(a, _Ncurve))
 
     assert(sMul(a, t1) == 1)
     return t1
 
+#Inverts every scalar of a with a single sInv() (Montgomery's trick)
+def vInv(a):
+    out = [to_int(x) for x in batch_invert(a, _Ncurve)]
+    for i in range(0, len(a)):
+        assert(out[i] > 0)
+
+    return out
+
 def vPow(x, N):
     if (x == 0):
         return [0]*N
@@ -170,20 +294,10 @@ if (useShamir):
         assert(len(A) >= len(a))
         assert(len(B) >= len(b))
 
-        out = NullPoint
-
-        #Use shamir in batches of 2*pvExpShamirSize points,
-        #Then do batch of remainder
-        for i in range(0, len(a), pvExpShamirSize):
-            ip = i+pvExpShamirSize
-            if (ip > len(a)):
-                ip = len(a)
-                
-            out = add(out, shamir(A[i:ip] + B[i:ip], a[i:ip] + b[i:ip]))
-    
-        return out
+        return multiexp(A[:len(a)] + B[:len(b)], a + b)
 
     def pvExp(a, b):
+        (Gi, Hi) = GetGiHi(max(len(a), len(b)))
         return pvExpCustom(Gi[:len(a)], Hi[:len(b)], a, b)
 else:
     def pvExpCustom(A, B, a, b):
@@ -199,6 +313,7 @@ else:
         return out
 
     def pvExp(a, b):
+        (Gi, Hi) = GetGiHi(max(len(a), len(b)))
         return pvExpCustom(Gi, Hi, a, b)
 
 def pvAdd(A, B):
@@ -225,6 +340,3 @@ def pvMul(A, a):
         out[i] = multiply(A[i], a[i])
 
     return out
-
-#Generate Base Points
-(Gi, Hi) = GenBasePoints(128, Gi, Hi)
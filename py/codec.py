@@ -0,0 +1,356 @@
+#Binary wire format for points, scalars, signatures and proofs
+#Encode(obj) => bytes, Decode(data) => obj for MSAG, MLSAG, CLSAG, PCRangeProof, PCAESMessage,
+#StealthTransaction, RingCT and BulletProof objects (e.g. for IPC between worker processes or storage).
+#
+#Layout: b"RCT" | version (1 byte) | object
+#  object:  type tag (1 byte) | fields
+#  scalar:  32 bytes, big endian (also used for values, offsets and addresses)
+#  point:   32 bytes, compressed (see CompressPoint), all zeros for the point at infinity
+#  count:   4 bytes, big endian (list lengths, small integers)
+#  bytes:   count | raw bytes
+#  list:    count | items
+#  None and the integer 0 (unset fields) have their own tags
+#
+#Decoding slices a memoryview of the input (no intermediate copies) and returns points as
+#LazyG1Point objects, which keep their compressed encoding and only run ExpandPoint() when
+#their coordinates are first used.  Point lists become a PointVector over a slice of the input,
+#so the input must not be modified while decoded objects are in use.
+#Every point is expanded once while decoding to check that it is on the curve (ValueError if not),
+#the expanded points stay in the point cache for later use.
+from ringct import *
+from bigint import int_types
+
+CODEC_MAGIC = b"RCT"
+CODEC_VERSION = 1
+
+_TAG_MSAG = 1
+_TAG_MLSAG = 2
+_TAG_PCRANGEPROOF = 3
+_TAG_PCAESMESSAGE = 4
+_TAG_STEALTHTRANSACTION = 5
+_TAG_RINGCT = 6
+_TAG_BULLETPROOF = 7
+_TAG_CLSAG = 8
+_TAG_RINGCT_CLSAG = 9
+_TAG_NONE = 10
+_TAG_ZERO = 0
+
+class Writer:
+    def __init__(self):
+        self.out = bytearray(CODEC_MAGIC)
+        self.out.append(CODEC_VERSION)
+
+    def count(self, x):
+        self.out += x.to_bytes(4, "big")
+
+    def scalar(self, x):
+        self.out += int(x).to_bytes(32, "big")
+
+    def point(self, P):
+        #CompressPoint() gives 0 for the point at infinity, and does not expand a LazyG1Point
+        if (is_point(P)):
+            P = CompressPoint(P)
+        self.scalar(P)
+
+    def raw(self, b):
+        self.count(len(b))
+        self.out += b
+
+    def scalars(self, v):
+        self.count(len(v))
+        if (type(v) == ScalarVector):
+            self.out += v.data
+            return
+
+        for x in v:
+            self.scalar(x)
+
+    def points(self, v):
+        self.count(len(v))
+        if (type(v) == PointVector):
+            self.out += v.data
+            return
+
+        for P in v:
+            self.point(P)
+
+    def counts(self, v):
+        self.count(len(v))
+        for x in v:
+            self.count(x)
+
+class Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+        if (bytes(self.data[0:3]) != CODEC_MAGIC):
+            raise ValueError("not an encoded RingCT object")
+
+        if (self.data[3] != CODEC_VERSION):
+            raise ValueError("unsupported codec version " + str(self.data[3]))
+
+        self.offset = 4
+
+    def _take(self, n):
+        if (self.offset + n > len(self.data)):
+            raise ValueError("truncated data")
+
+        out = self.data[self.offset:self.offset+n]
+        self.offset += n
+        return out
+
+    def byte(self):
+        return self._take(1)[0]
+
+    def count(self):
+        return int.from_bytes(self._take(4), "big")
+
+    def scalar(self):
+        return int.from_bytes(self._take(32), "big")
+
+    def point(self):
+        x = self.scalar()
+        if (x == 0):
+            return NullPoint
+
+        ExpandPoint(x)
+        return LazyG1Point(x)
+
+    def raw(self):
+        return bytes(self._take(self.count()))
+
+    def scalars(self):
+        return [self.scalar() for i in range(0, self.count())]
+
+    #Points are kept compressed, as a PointVector over the input (no copy), once checked to be on the curve
+    def points(self):
+        out = PointVector.FromBytes(self._take(32*self.count()))
+        ExpandPoints([x for x in (out.Compressed(i) for i in range(0, len(out))) if x != 0])
+        return out
+
+    def counts(self):
+        return [self.count() for i in range(0, self.count())]
+
+def _write_object(w, obj):
+    from bulletproof import BulletProof
+
+    if (obj is None):
+        w.out.append(_TAG_NONE)
+    elif (isinstance(obj, int_types) and obj == 0):
+        #Unset fields (e.g. StealthTransaction.pc_encrypted_data = 0)
+        w.out.append(_TAG_ZERO)
+    elif (isinstance(obj, MSAG)):
+        w.out.append(_TAG_MSAG)
+        w.raw(obj.msgHash)
+        w.count(obj.m)
+        w.points(obj.pub_keys)
+        w.scalars(obj.signature)
+    elif (isinstance(obj, MLSAG)):
+        w.out.append(_TAG_MLSAG)
+        w.raw(obj.msgHash)
+        w.points(obj.key_images)
+        w.points(obj.pub_keys)
+        w.scalars(obj.signature)
+    elif (isinstance(obj, CLSAG)):
+        w.out.append(_TAG_CLSAG)
+        w.raw(obj.msgHash)
+        w.points(obj.key_images)
+        w.points(obj.pub_keys)
+        w.scalars(obj.signature)
+    elif (isinstance(obj, PCRangeProof)):
+        w.out.append(_TAG_PCRANGEPROOF)
+        w.point(obj.total_commit)
+        w.count(obj.power10)
+        w.scalar(obj.offset)
+        w.scalar(obj.value)
+        w.scalar(obj.bf)
+        _write_object(w, obj.range_proof)
+    elif (isinstance(obj, PCAESMessage)):
+        w.out.append(_TAG_PCAESMESSAGE)
+        w.raw(obj.message)
+        w.raw(obj.iv)
+    elif (isinstance(obj, StealthTransaction)):
+        w.out.append(_TAG_STEALTHTRANSACTION)
+        w.point(obj.pub_key)
+        w.point(obj.dhe_point)
+
+        #c_value is a commitment (point) for encrypted transactions, a plain value otherwise
+        if (is_point(obj.c_value)):
+            w.out.append(1)
+            w.point(obj.c_value)
+        else:
+            w.out.append(0)
+            w.scalar(obj.c_value)
+
+        _write_object(w, obj.pc_encrypted_data)
+    elif (isinstance(obj, RingCT)):
+        w.out.append(_TAG_RINGCT_CLSAG if obj.IsCLSAG() else _TAG_RINGCT)
+        w.count(obj.ring_size)
+        w.count(obj.input_count)
+        w.points(obj.input_commitments)
+        w.count(len(obj.output_transactions))
+        for tx in obj.output_transactions:
+            _write_object(w, tx)
+
+        #One MLSAG, or one CLSAG per input and the pseudo commitments
+        if (obj.IsCLSAG()):
+            w.count(len(obj.clsag))
+            for sig in obj.clsag:
+                _write_object(w, sig)
+            w.points(obj.pseudo_commitments)
+        else:
+            _write_object(w, obj.mlsag)
+
+        w.scalar(obj.redeem_eth_address)
+        w.scalar(obj.redeem_eth_value)
+    elif (isinstance(obj, BulletProof)):
+        w.out.append(_TAG_BULLETPROOF)
+        w.points(obj.total_commit)
+        w.counts(obj.power10)
+        w.scalars(obj.offset)
+        w.scalars(obj.value)
+        w.scalars(obj.bf)
+        w.points(obj.V)
+        w.point(obj.A)
+        w.point(obj.S)
+        w.point(obj.T1)
+        w.point(obj.T2)
+        w.scalar(obj.taux)
+        w.scalar(obj.mu)
+        w.points(obj.L)
+        w.points(obj.R)
+        w.scalar(obj.a)
+        w.scalar(obj.b)
+        w.scalar(obj.t)
+        w.count(obj.N)
+    else:
+        raise TypeError("cannot encode " + type(obj).__name__)
+
+def _read_object(r):
+    tag = r.byte()
+
+    if (tag == _TAG_NONE):
+        return None
+    elif (tag == _TAG_ZERO):
+        return 0
+    elif (tag == _TAG_MSAG):
+        msgHash = r.raw()
+        m = r.count()
+        return MSAG(msgHash, m, r.points(), r.scalars())
+    elif (tag == _TAG_MLSAG):
+        msgHash = r.raw()
+        key_images = r.points()
+        pub_keys = r.points()
+        return MLSAG(msgHash, key_images, pub_keys, r.scalars())
+    elif (tag == _TAG_CLSAG):
+        msgHash = r.raw()
+        key_images = r.points()
+        pub_keys = r.points()
+        return CLSAG(msgHash, key_images, pub_keys, r.scalars())
+    elif (tag == _TAG_PCRANGEPROOF):
+        total_commit = r.point()
+        power10 = r.count()
+        offset = r.scalar()
+        value = r.scalar()
+        bf = r.scalar()
+        proof = PCRangeProof(total_commit, power10, offset, value, bf, _read_object(r))
+        proof.bf = bf
+        return proof
+    elif (tag == _TAG_PCAESMESSAGE):
+        message = r.raw()
+        return PCAESMessage(message, r.raw())
+    elif (tag == _TAG_STEALTHTRANSACTION):
+        pub_key = r.point()
+        dhe_point = r.point()
+        if (r.byte() == 1):
+            c_value = r.point()
+        else:
+            c_value = r.scalar()
+        return StealthTransaction(pub_key, dhe_point, c_value, _read_object(r))
+    elif (tag == _TAG_RINGCT or tag == _TAG_RINGCT_CLSAG):
+        ring_size = r.count()
+        input_count = r.count()
+        input_commitments = r.points()
+        output_transactions = [_read_object(r) for i in range(0, r.count())]
+
+        (mlsag, clsag, pseudo_commitments) = (0, None, None)
+        if (tag == _TAG_RINGCT_CLSAG):
+            clsag = [_read_object(r) for i in range(0, r.count())]
+            pseudo_commitments = r.points()
+        else:
+            mlsag = _read_object(r)
+
+        redeem_eth_address = r.scalar()
+        redeem_eth_value = r.scalar()
+        return RingCT(ring_size, input_count, input_commitments, output_transactions, mlsag,
+                      redeem_eth_address, redeem_eth_value, clsag, pseudo_commitments)
+    elif (tag == _TAG_BULLETPROOF):
+        from bulletproof import BulletProof
+
+        total_commit = r.points()
+        power10 = r.counts()
+        offset = r.scalars()
+        value = r.scalars()
+        bf = r.scalars()
+        V = r.points()
+        (A, S, T1, T2) = (r.point(), r.point(), r.point(), r.point())
+        (taux, mu) = (r.scalar(), r.scalar())
+        L = r.points()
+        R = r.points()
+        (a, b, t) = (r.scalar(), r.scalar(), r.scalar())
+        return BulletProof(total_commit, power10, offset, value, bf, V, A, S, T1, T2, taux, mu, L, R, a, b, t, r.count())
+    else:
+        raise ValueError("unknown object tag " + str(tag))
+
+def Encode(obj):
+    w = Writer()
+    _write_object(w, obj)
+    return bytes(w.out)
+
+def Decode(data):
+    r = Reader(data)
+    obj = _read_object(r)
+    if (r.offset != len(r.data)):
+        raise ValueError("trailing data")
+
+    return obj
+
+def Codec_Test():
+    import io
+    import contextlib
+    from bulletproof import BulletProof
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rct = RingCTTest(2, 3, 2)
+        rct_clsag = RingCTTest(2, 3, 2, useCLSAG=True)
+
+    objects = [rct, rct.mlsag, rct_clsag, rct_clsag.clsag[0], rct.output_transactions[0], PCRangeProof.Generate(48, 0, 1000, 0, getRandom()),
+               MSAG.Sign_GenRandom(1, int_to_bytes32(1), [3], [0], [MultiplyG1(4)]),
+               BulletProof.Generate([5, 7], N=8), None]
+
+    passed = True
+    for obj in objects:
+        data = Encode(obj)
+        obj2 = Decode(data)
+        ok = (Encode(obj2) == data)
+        if (hasattr(obj2, "Verify")):
+            ok = ok and obj2.Verify()
+
+        print(type(obj).__name__ + " (" + str(len(data)) + " bytes) => " + ("Success!" if ok else "Failure!"))
+        passed = passed and ok
+
+    #Points off the curve (x = 4 has no y) must be rejected, alone and in point lists
+    bad = LazyG1Point(4)
+    for obj in [StealthTransaction(bad, MultiplyG1(2), MultiplyG1(3), PCAESMessage.Encrypt(1, 2, 3)),
+                MSAG(int_to_bytes32(1), 1, [MultiplyG1(4), bad], [1, 2, 3])]:
+        try:
+            Decode(Encode(obj))
+            ok = False
+        except ValueError:
+            ok = True
+
+        print(type(obj).__name__ + " (point off the curve) => " + ("Success!" if ok else "Failure!"))
+        passed = passed and ok
+
+    return passed
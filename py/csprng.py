@@ -0,0 +1,74 @@
+#Buffered random scalar source
+#Reads os.urandom() in large blocks and rejection samples uniform scalars (mod n) from 254-bit
+#chunks, so drawing many scalars costs one system call per block instead of one per scalar.
+#A stream may instead be seeded (opt-in) for reproducible benchmarks and test vectors, in which
+#case its blocks are keccak256(keccak256(seed) || counter).  Seeded streams are NOT secure.
+import os
+import threading
+import sha3
+
+class ScalarStream:
+    def __init__(self, n, seed=None, blockSize=4096):
+        assert(n.bit_length() <= 254)
+
+        self.n = n
+        self.blockSize = blockSize
+        self.buffer = b""
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.Seed(seed)
+
+    #seed=None => os.urandom(), otherwise deterministic (bytes or a 256-bit int)
+    def Seed(self, seed=None):
+        with self.lock:
+            if (seed == None):
+                self.key = None
+            else:
+                if (not isinstance(seed, bytes)):
+                    seed = int(seed).to_bytes(32, "big")
+
+                self.key = sha3.keccak_256(seed).digest()
+
+            self.counter = 0
+            self.buffer = b""
+            self.offset = 0
+
+    def IsDeterministic(self):
+        return self.key != None
+
+    def _refill(self):
+        if (self.key == None):
+            self.buffer = os.urandom(self.blockSize)
+        else:
+            blocks = []
+            for i in range(0, self.blockSize // 32):
+                blocks.append(sha3.keccak_256(self.key + self.counter.to_bytes(8, "big")).digest())
+                self.counter += 1
+
+            self.buffer = b"".join(blocks)
+
+        self.offset = 0
+
+    #Returns count uniform scalars in [0, n)
+    def Scalars(self, count):
+        mask = (1 << 254) - 1
+        out = []
+        with self.lock:
+            #A forked child must not reuse its parent's buffered bytes
+            if (self.pid != os.getpid()):
+                self.pid = os.getpid()
+                if (self.key == None):
+                    self.buffer = b""
+                    self.offset = 0
+
+            while (len(out) < count):
+                if (self.offset + 32 > len(self.buffer)):
+                    self._refill()
+
+                x = int.from_bytes(self.buffer[self.offset:self.offset+32], "big") & mask
+                self.offset += 32
+                if (x < self.n):
+                    out.append(x)
+
+        return out
@@ -1,18 +1,14 @@
 from ring_signatures import *
 
 class PCRangeProof:
-    total_commit = NullPoint
-    power10 = 0
-    offset = 0
-    value = 0
-    bf = 0
-    range_proof = 0
+    __slots__ = ("total_commit", "power10", "offset", "value", "bf", "range_proof")
     
     def __init__(self, total_commit, power10, offset, value, bf, range_proof):
-        self.total_commit = total_commit
+        self.total_commit = CompactPoint(total_commit)
         self.power10 = power10
         self.offset = offset
         self.value = value
+        self.bf = 0     #The blinding factor is not kept, decoded proofs set it afterwards (see codec.py)
         self.range_proof = range_proof
 
     def GetTotalCommitment(self):
@@ -37,7 +33,7 @@ class PCRangeProof:
             return (val, power10, rem, bits)
 
     def Commit(value, blinding_factor):
-        point = shamir([G1, H], [blinding_factor, value])
+        point = CommitG1H(blinding_factor, value)
             
         return point
 
@@ -74,16 +70,14 @@ class PCRangeProof:
             indices = indices + [v]
                 
                 
+            #Commitments to v - k at digit position i (k = 0 ... 3): bf*G1 + (v-k)*(4^i)*H
             p1 = PCRangeProof.Commit(v * (4**i), bf)
-            p2 = neg(multiply(H, 4**i))
+            D = GetDigitTable(i)
             
-            c = c + [p1]            
-            p1 = add(p1, p2)
-            cp = cp + [p1]
-            p1 = add(p1, p2)
-            cpp = cpp + [p1]
-            p1 = add(p1, p2)
-            cppp = cppp + [p1]
+            c = c + [p1]
+            cp = cp + [add(p1, D[2])]
+            cpp = cpp + [add(p1, D[1])]
+            cppp = cppp + [add(p1, D[0])]
 
 
         commitments = c + cp + cpp + cppp
@@ -91,13 +85,15 @@ class PCRangeProof:
         range_proof = MSAG.Sign_GenRandom(bits, int_to_bytes32(CompressPoint(total_commit)), keys, indices, commitments)
 
         if (power10 > 0):
-            total_commit = multiply(total_commit, 10**power10)
             total_blinding_factor = (total_blinding_factor * (10**power10)) % Ncurve
             value = value * (10**power10)
 
         if (offset > 0):
-            total_commit = add(total_commit, multiply(H, offset))
             value = value + offset
+
+        #Same as (10^power10)*total_commit + offset*H, without the variable base multiplication
+        if (power10 > 0 or offset > 0):
+            total_commit = PCRangeProof.Commit(value % Ncurve, total_blinding_factor)
             
         return PCRangeProof(total_commit, power10, offset, value, bf, range_proof)
             
@@ -106,22 +102,21 @@ class PCRangeProof:
         L = len(self.range_proof.pub_keys)
         if (L % 4 != 0): return False
         L = L // 4
+        pub_keys = list(self.range_proof.pub_keys)
         
         #Check that bitwise commitments add up
         point = NullPoint
         for i in range(0, L):
-            point = add(point, self.range_proof.pub_keys[i])
+            point = add(point, pub_keys[i])
         
         if (not eq(point, self.GetTotalCommitment())): return False
 
-        #Check that counter commitments are OK
-        for i in range(0, L):
-            point = self.range_proof.pub_keys[i]
-            subtract = neg(multiply(H, 4**i))
-
-            for j in range(1, 4):
-                point = add(point, subtract)
-                if (not eq(point, self.range_proof.pub_keys[j*L + i])): return False
+        #Check that counter commitments are OK (commitment - j*(4^i)*H), all normalized together and
+        #compared by their compressed encodings
+        points = [add(pub_keys[i], GetDigitTable(i)[3-j]) for j in range(1, 4) for i in range(0, L)]
+        batch_affine(points)
+        for k in range(0, 3*L):
+            if (points[k].compressed() != self.range_proof.pub_keys.Compressed(L + k)): return False
                         
         return self.range_proof.Verify()
 
@@ -167,8 +162,7 @@ class PCRangeProof:
         print(str(self.offset))
         
 class PCAESMessage:
-    message = b""
-    iv = b""
+    __slots__ = ("message", "iv")
 
     def __init__(self, message, iv):
         self.message = message
@@ -232,7 +226,7 @@ def RangeProofTest(value=48, pow10=18, bits=0, offset=1000000, bf=getRandom()):
 def AESTest(value=48, pow10=18, offset=1000000,bf=getRandom()):
     v = value*(10**pow10)+offset
     print("Hiding " + str(v) + " and blinding factor " + hex(bf))
-    shared_secret = hash_of_point(multiply(G1, getRandom()))
+    shared_secret = hash_of_point(MultiplyG1(getRandom()))
     msg = PCAESMessage.Encrypt(v, bf, shared_secret)
     msg.Print()
 
@@ -0,0 +1,467 @@
+#Integer kernel for G1 arithmetic (y**2 = x**3 + 3 over FQ)
+#Points are plain (X, Y, Z) integer triples in Jacobian coordinates (x = X/Z**2, y = Y/Z**3),
+#so the hot loops do modular arithmetic inline instead of going through FQ operators.
+#Precomputed tables hold affine (x, y) pairs and are added with mixed Jacobian + affine addition.
+#This module is internal: util.py and optimized_curve.py convert to and from the
+#public point format (G1Point, or (FQ, FQ, FQ) tuples; homogeneous projective) only at their API boundary.
+from optimized_field_elements import (
+    _field_modulus,
+    _fq,
+)
+from bigint import invert
+from g1point import (
+    G1Point,
+    g1point_from_affine,
+)
+
+P = _field_modulus
+
+#Order of G1 (same as optimized_curve.curve_order)
+R = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+
+#Point at infinity
+INF = (0, 0, 0)
+
+#GLV endomorphism: phi(x, y) = (BETA*x, y) = LAMBDA*(x, y), BETA**3 == 1 mod P, LAMBDA**3 == 1 mod R
+BETA = 0x59e26bcea0d48bacd4f263f1acdb5c4f5763473177fffffe
+LAMBDA = 0xb3c4d79d41a917585bfc41088d8daaa78b17ea66b99c90dd
+
+#Short basis (a1, b1), (a2, b2) of the lattice {(a, b) : a + b*LAMBDA == 0 mod R}
+GLV_A1 = 9931322734385697763
+GLV_B1 = -147946756881789319000765030803803410728
+GLV_A2 = 147946756881789319010696353538189108491
+GLV_B2 = 9931322734385697763
+
+assert (BETA * BETA * BETA) % _field_modulus == 1 and BETA != 1
+assert (LAMBDA * LAMBDA + LAMBDA + 1) % R == 0
+assert (GLV_A1 + GLV_B1 * LAMBDA) % R == 0
+assert (GLV_A2 + GLV_B2 * LAMBDA) % R == 0
+
+#(x, y, z) homogeneous FQ tuple or G1Point => Jacobian (x*z, y*z**2, z)
+def to_raw(pt):
+    if type(pt) is G1Point and pt._affine is not None and pt.z.n != 0:
+        x, y = pt._affine
+        return (x, y, 1)
+    x, y, z = pt[0].n, pt[1].n, pt[2].n
+    if z == 1:
+        return (x, y, 1)
+    return (x * z % P, y * z % P * z % P, z)
+
+#Jacobian => G1Point, homogeneous (X*Z, Y, Z**3)
+def from_raw(pt):
+    X, Y, Z = pt
+    if Z == 1:
+        return g1point_from_affine(X, Y)
+    return G1Point(_fq(X * Z % P), _fq(Y), _fq(Z * Z % P * Z % P))
+
+#Affine (x, y) => G1Point
+def from_affine(pt):
+    return g1point_from_affine(pt[0], pt[1])
+
+def is_inf(pt):
+    return pt[2] == 0
+
+def neg(pt):
+    return (pt[0], (-pt[1]) % P, pt[2])
+
+def eq(p1, p2):
+    X1, Y1, Z1 = p1
+    X2, Y2, Z2 = p2
+    #Cross-multiplying by Z == 0 would make infinity equal to every point
+    if Z1 == 0 or Z2 == 0:
+        return Z1 == 0 and Z2 == 0
+    Z1Z1 = Z1 * Z1 % P
+    Z2Z2 = Z2 * Z2 % P
+    return ((X1 * Z2Z2 - X2 * Z1Z1) % P == 0 and
+            (Y1 * Z2Z2 * Z2 - Y2 * Z1Z1 * Z1) % P == 0)
+
+#Jacobian => affine (x, y), one inversion
+def to_affine(pt):
+    X, Y, Z = pt
+    if Z == 0:
+        return None
+    zi = invert(Z, P)
+    zi2 = zi * zi % P
+    return (X * zi2 % P, Y * zi2 % P * zi % P)
+
+#Jacobian => affine for a list of points, sharing a single inversion (Montgomery's trick)
+#Points at infinity map to None
+def batch_to_affine(points):
+    n = len(points)
+    prefix = [1] * (n + 1)
+    acc = 1
+    for i in range(0, n):
+        Z = points[i][2]
+        if Z != 0:
+            acc = acc * Z % P
+        prefix[i+1] = acc
+
+    inv = invert(acc, P)
+    out = [None] * n
+    for i in reversed(range(0, n)):
+        X, Y, Z = points[i]
+        if Z == 0:
+            continue
+        zi = inv * prefix[i] % P
+        inv = inv * Z % P
+        zi2 = zi * zi % P
+        out[i] = (X * zi2 % P, Y * zi2 % P * zi % P)
+
+    return out
+
+#Doubling specialized for a = 0 (dbl-2009-l)
+def double(pt):
+    X, Y, Z = pt
+    if Z == 0:
+        return pt
+    A = X * X % P
+    B = Y * Y % P
+    C = B * B % P
+    D = 4 * X * B % P
+    E = 3 * A
+    X3 = (E * E - 2 * D) % P
+    Y3 = (E * (D - X3) - 8 * C) % P
+    Z3 = 2 * Y * Z % P
+    return (X3, Y3, Z3)
+
+#Jacobian + Jacobian addition
+def add(p1, p2):
+    X1, Y1, Z1 = p1
+    X2, Y2, Z2 = p2
+    if Z1 == 0 or Z2 == 0:
+        return p1 if Z2 == 0 else p2
+    Z1Z1 = Z1 * Z1 % P
+    Z2Z2 = Z2 * Z2 % P
+    U1 = X1 * Z2Z2 % P
+    U2 = X2 * Z1Z1 % P
+    S1 = Y1 * Z2 % P * Z2Z2 % P
+    S2 = Y2 * Z1 % P * Z1Z1 % P
+    H = (U2 - U1) % P
+    r = (S2 - S1) % P
+    if H == 0:
+        if r == 0:
+            return double(p1)
+        return INF
+    HH = H * H % P
+    HHH = H * HH % P
+    V = U1 * HH % P
+    X3 = (r * r - HHH - 2 * V) % P
+    Y3 = (r * (V - X3) - S1 * HHH) % P
+    Z3 = Z1 * Z2 % P * H % P
+    return (X3, Y3, Z3)
+
+#Mixed Jacobian + affine addition (madd), q = (x, y)
+def add_affine(p1, q):
+    X1, Y1, Z1 = p1
+    x2, y2 = q
+    if Z1 == 0:
+        return (x2, y2, 1)
+    Z1Z1 = Z1 * Z1 % P
+    U2 = x2 * Z1Z1 % P
+    S2 = y2 * Z1 % P * Z1Z1 % P
+    H = (U2 - X1) % P
+    r = (S2 - Y1) % P
+    if H == 0:
+        if r == 0:
+            return double(p1)
+        return INF
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (r * r - HHH - 2 * V) % P
+    Y3 = (r * (V - X3) - Y1 * HHH) % P
+    Z3 = Z1 * H % P
+    return (X3, Y3, Z3)
+
+#Signed window NAF digits of s, least significant first
+def wnaf(s, wBits=5):
+    wPow = (1 << wBits)
+    wPowOver2 = wPow >> 1
+    dj = []
+    while (s > 0):
+        if (s & 1):
+            d = s & (wPow - 1)
+            if (d > wPowOver2):
+                d = d - wPow
+
+            s -= d
+            dj.append(d)
+        else:
+            dj.append(0)
+
+        s >>= 1
+
+    return dj
+
+#Calculate Precompiled Points: [1, 3, 5, ...]*pt, in Jacobian coordinates
+def precompute_jacobian(pt, wBits=5):
+    P_pre = [pt] * (1 << (wBits-2))
+    pt2 = double(pt)
+
+    for i in range(1, len(P_pre)):
+        P_pre[i] = add(P_pre[i-1], pt2)
+
+    return P_pre
+
+#Calculate Precompiled Points: [1, 3, 5, ...]*pt, as affine (x, y) pairs
+def precompute(pt, wBits=5):
+    return batch_to_affine(precompute_jacobian(pt, wBits))
+
+#Windowed NAF multiplication using an affine table from precompute()
+def multiply(pt, s, P_pre=None, wBits=5):
+    if (pt[2] == 0):
+        return INF
+
+    if (P_pre == None):
+        P_pre = precompute(pt, wBits)
+
+    #Negated table entries
+    N_pre = [(x, P - y) for (x, y) in P_pre]
+
+    dj = wnaf(s, wBits)
+
+    Q = INF
+    for j in reversed(range(0, len(dj))):
+        Q = double(Q)
+        d = dj[j]
+        if (d > 0):
+            Q = add_affine(Q, P_pre[(d - 1) >> 1])
+        elif (d < 0):
+            Q = add_affine(Q, N_pre[(-d - 1) >> 1])
+
+    return Q
+
+#Split s into (k1, k2) with s == k1 + k2*LAMBDA (mod R) and |k1|, |k2| ~ 2**127
+def glv_decompose(s):
+    k = s % R
+    c1 = (2 * GLV_B2 * k + R) // (2 * R)
+    c2 = (-2 * GLV_B1 * k + R) // (2 * R)
+    k1 = k - c1 * GLV_A1 - c2 * GLV_A2
+    k2 = -c1 * GLV_B1 - c2 * GLV_B2
+    return (k1, k2)
+
+#GLV multiplication: s*pt = k1*pt + k2*phi(pt), evaluated as two interleaved
+#half-length wNAFs sharing one doubling chain
+def multiply_glv(pt, s, P_pre=None, wBits=5):
+    if (pt[2] == 0):
+        return INF
+
+    if (P_pre == None):
+        P_pre = precompute(pt, wBits)
+
+    (k1, k2) = glv_decompose(s)
+
+    #Tables for +-pt and +-phi(pt), signs folded in so both digit strings are non-negative
+    T1 = P_pre if k1 >= 0 else [(x, P - y) for (x, y) in P_pre]
+    T2 = [(BETA * x % P, y) for (x, y) in P_pre]
+    if (k2 < 0):
+        T2 = [(x, P - y) for (x, y) in T2]
+    N1 = [(x, P - y) for (x, y) in T1]
+    N2 = [(x, P - y) for (x, y) in T2]
+
+    d1 = wnaf(abs(k1), wBits)
+    d2 = wnaf(abs(k2), wBits)
+    l1 = len(d1)
+    l2 = len(d2)
+
+    Q = INF
+    for j in reversed(range(0, max(l1, l2))):
+        Q = double(Q)
+        if (j < l1):
+            d = d1[j]
+            if (d > 0):
+                Q = add_affine(Q, T1[(d - 1) >> 1])
+            elif (d < 0):
+                Q = add_affine(Q, N1[(-d - 1) >> 1])
+        if (j < l2):
+            d = d2[j]
+            if (d > 0):
+                Q = add_affine(Q, T2[(d - 1) >> 1])
+            elif (d < 0):
+                Q = add_affine(Q, N2[(-d - 1) >> 1])
+
+    return Q
+
+#Fixed-base table: table[i][j-1] = j * 2**(wBits*i) * pt (affine) for j = 1 ... 2**(wBits-1)
+#Enough windows are built to cover any scalar mod R in signed base 2**wBits
+def fixed_base_windows(wBits):
+    return (R.bit_length() + wBits - 1) // wBits + 1
+
+def fixed_base_table(pt, wBits):
+    half = 1 << (wBits-1)
+    points = []
+    B = pt
+    for i in range(0, fixed_base_windows(wBits)):
+        Q = B
+        points.append(Q)
+        for j in range(2, half+1):
+            Q = add(Q, B)
+            points.append(Q)
+
+        #Next window base: 2**wBits * B = 2 * (half * B)
+        B = double(Q)
+
+    #Normalize the whole table with one inversion
+    points = batch_to_affine(points)
+    return [points[i*half:(i+1)*half] for i in range(0, len(points) // half)]
+
+#Fixed-base multiplication: adds one table entry per signed base 2**wBits digit of s,
+#no doublings.  The result is accumulated onto Q.
+def multiply_fixed(table, s, wBits, Q=INF):
+    wPow = 1 << wBits
+    half = wPow >> 1
+    k = s % R
+    i = 0
+    while (k > 0):
+        d = k & (wPow - 1)
+        if (d > half):
+            d -= wPow
+
+        if (d > 0):
+            Q = add_affine(Q, table[i][d-1])
+        elif (d < 0):
+            x, y = table[i][-d-1]
+            Q = add_affine(Q, (x, P - y))
+
+        k = (k - d) >> wBits
+        i += 1
+
+    return Q
+
+#Multi-exponentiation: sum(scalars[i]*points[i])
+#Scalars are reduced mod R and split with the GLV endomorphism, then evaluated with
+#Straus (interleaved wNAF) for small inputs or Pippenger (bucket method) for large ones,
+#whichever the cost model below estimates to be cheaper.
+def multiexp(points, scalars):
+    assert(len(points) == len(scalars))
+
+    #Drop zero terms, normalize the remaining points to affine with one inversion
+    terms = [(pt, s % R) for (pt, s) in zip(points, scalars) if pt[2] != 0 and s % R != 0]
+    if (len(terms) == 0):
+        return INF
+
+    affine = batch_to_affine([pt for (pt, k) in terms])
+    scalars = [k for (pt, k) in terms]
+
+    (straus_cost, wBits) = straus_window(len(affine))
+    (pippenger_cost, c) = pippenger_window(2 * len(affine))
+    if (straus_cost <= pippenger_cost):
+        return straus(affine, scalars, wBits)
+    else:
+        return pippenger(affine, scalars, c)
+
+#Estimated point operations for Straus on n points (two ~128-bit GLV halves each)
+def straus_window(n, bits=128):
+    best = None
+    for wBits in range(2, 9):
+        cost = bits + n * (1 << (wBits-2)) + 2 * n * bits // (wBits+1)
+        if (best == None or cost < best[0]):
+            best = (cost, wBits)
+
+    return best
+
+#Estimated point operations for Pippenger on n points (already GLV split)
+def pippenger_window(n, bits=128):
+    best = None
+    for c in range(2, 17):
+        windows = (bits + c) // c
+        cost = bits + windows * (n + 2 * (1 << (c-1)))
+        if (best == None or cost < best[0]):
+            best = (cost, c)
+
+    return best
+
+#Straus: one wNAF table per affine point (shared with its GLV image), one doubling chain
+def straus(affine, scalars, wBits=5):
+    size = 1 << (wBits-2)
+    jacobian = []
+    for (x, y) in affine:
+        jacobian.extend(precompute_jacobian((x, y, 1), wBits))
+
+    tables = batch_to_affine(jacobian)
+    return straus_precomputed([tables[i*size:(i+1)*size] for i in range(0, len(affine))], scalars, wBits)
+
+#Straus with the affine wNAF table of each point already built (see precompute())
+def straus_precomputed(tables, scalars, wBits=5):
+    entries = []
+    for i in range(0, len(tables)):
+        T = tables[i]
+        (k1, k2) = glv_decompose(scalars[i])
+
+        T1 = T if k1 >= 0 else [(x, P - y) for (x, y) in T]
+        T2 = [(BETA * x % P, y) for (x, y) in T]
+        if (k2 < 0):
+            T2 = [(x, P - y) for (x, y) in T2]
+
+        entries.append((wnaf(abs(k1), wBits), T1, [(x, P - y) for (x, y) in T1]))
+        entries.append((wnaf(abs(k2), wBits), T2, [(x, P - y) for (x, y) in T2]))
+
+    Q = INF
+    for j in reversed(range(0, max([len(d) for (d, T, N) in entries]))):
+        Q = double(Q)
+        for (d, T, N) in entries:
+            if (j < len(d)):
+                dj = d[j]
+                if (dj > 0):
+                    Q = add_affine(Q, T[(dj - 1) >> 1])
+                elif (dj < 0):
+                    Q = add_affine(Q, N[(-dj - 1) >> 1])
+
+    return Q
+
+#Pippenger: signed base 2**c digits sorted into 2**(c-1) buckets per window
+def pippenger(affine, scalars, c):
+    #GLV split into twice as many points with ~128-bit non-negative scalars
+    points = []
+    ks = []
+    for i in range(0, len(affine)):
+        (x, y) = affine[i]
+        (k1, k2) = glv_decompose(scalars[i])
+        points.append((x, y) if k1 >= 0 else (x, P - y))
+        ks.append(abs(k1))
+        points.append((BETA * x % P, y) if k2 >= 0 else (BETA * x % P, P - y))
+        ks.append(abs(k2))
+
+    wPow = 1 << c
+    half = wPow >> 1
+    windows = (max(ks).bit_length() + c) // c
+
+    #Signed digits, digits[i][w] for point i and window w
+    digits = []
+    for k in ks:
+        d = [0] * windows
+        for w in range(0, windows):
+            dw = k & (wPow - 1)
+            if (dw > half):
+                dw -= wPow
+
+            d[w] = dw
+            k = (k - dw) >> c
+
+        digits.append(d)
+
+    negated = [(x, P - y) for (x, y) in points]
+
+    Q = INF
+    for w in reversed(range(0, windows)):
+        for i in range(0, c):
+            Q = double(Q)
+
+        buckets = [INF] * half
+        for i in range(0, len(points)):
+            dw = digits[i][w]
+            if (dw > 0):
+                buckets[dw-1] = add_affine(buckets[dw-1], points[i])
+            elif (dw < 0):
+                buckets[-dw-1] = add_affine(buckets[-dw-1], negated[i])
+
+        #sum(j * buckets[j-1]) with running sums
+        running = INF
+        total = INF
+        for j in reversed(range(0, half)):
+            running = add(running, buckets[j])
+            total = add(total, running)
+
+        Q = add(Q, total)
+
+    return Q
@@ -0,0 +1,93 @@
+#G1 point type
+#Holds the same homogeneous (x, y, z) FQ coordinates as the (FQ, FQ, FQ) tuples used throughout,
+#and can be used anywhere such a tuple is expected (indexing, unpacking, len(), ==).
+#The affine coordinates and the compressed encoding are computed on first use, with a single
+#inversion, and cached.  G1Point objects are immutable.
+from optimized_field_elements import (
+    _field_modulus,
+    _fq,
+    _FQ_ONE,
+)
+from bigint import (
+    invert,
+    batch_invert,
+    to_int,
+)
+
+#Sign bit of a compressed point (same as util.ECSignMask)
+_sign_mask = 1 << 255
+
+class G1Point(object):
+    __slots__ = ("x", "y", "z", "_affine", "_compressed")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+        self._affine = None
+        self._compressed = None
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z)[i]
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self):
+        return 3
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, G1Point)):
+            return (self.x, self.y, self.z) == tuple(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        out = self.__eq__(other)
+        return out if out is NotImplemented else not out
+
+    #Unhashable, like a tuple of FQ
+    __hash__ = None
+
+    def __repr__(self):
+        return repr((self.x, self.y, self.z))
+
+    #Affine (x, y) as Python integers, the point at infinity gives (0, 0) like normalize()
+    #(_affine keeps the backend integers for the kernel, see curve_kernel.to_raw)
+    def affine(self):
+        if self._affine is None:
+            zi = invert(self.z.n, _field_modulus)
+            self._affine = (self.x.n * zi % _field_modulus, self.y.n * zi % _field_modulus)
+        return (to_int(self._affine[0]), to_int(self._affine[1]))
+
+    #Compressed encoding (x, with the parity of y in the sign bit), as util.CompressPoint()
+    def compressed(self):
+        if self._compressed is None:
+            x, y = self.affine()
+            self._compressed = (x | _sign_mask) if (y & 0x1) else x
+        return self._compressed
+
+#Affine integers (x, y) => G1Point, with the affine form already cached
+def g1point_from_affine(x, y):
+    pt = G1Point(_fq(x), _fq(y), _FQ_ONE)
+    pt._affine = (x, y)
+    return pt
+
+#Returns pt as a G1Point ((FQ, FQ, FQ) tuples are wrapped)
+def to_g1point(pt):
+    if isinstance(pt, G1Point):
+        return pt
+    x, y, z = pt
+    return G1Point(x, y, z)
+
+#Affine (x, y) integers of a list of points, computing the missing ones with a single
+#inversion and caching them on the G1Point objects
+def batch_affine(points):
+    points = [to_g1point(p) for p in points]
+    todo = [p for p in points if p._affine is None]
+    if (len(todo) > 0):
+        zi = batch_invert([p.z.n for p in todo], _field_modulus)
+        for i in range(0, len(todo)):
+            p = todo[i]
+            p._affine = (p.x.n * zi[i] % _field_modulus, p.y.n * zi[i] % _field_modulus)
+
+    return [(to_int(p._affine[0]), to_int(p._affine[1])) for p in points]
@@ -37,6 +37,7 @@ rct.SetStealthAddress(StealthAddress1[0], StealthAddress1[1])
 try:
     fromBlock = 0
     UTXOImport = []
+    rows = []
     with open("utxo.csv", "r") as file:
         print("UTXO file found, importing")
         reader = csv.reader(file, delimiter=",")
@@ -52,24 +53,41 @@ try:
                 pass
 
             else:
-                pub_key = ExpandPoint(int(row[0],16))
-                dhe_point = ExpandPoint(int(row[1],16))
-
-                try:
-                    c_value = int(row[2],10)
-                    tx = StealthTransaction(pub_key, dhe_point, c_value)
-                except ValueError:
-                    c_value = ExpandPoint(int(row[2],16))
-                    encrypted_data = PCAESMessage(int_to_bytes64(int(row[3],16)), int_to_bytes16(int(row[4],16)))
-                    tx = StealthTransaction(pub_key, dhe_point, c_value, encrypted_data)
-
-                (owned, duplicate) = rct.AddTx(tx)
-                if (owned and not duplicate):
-                    priv_key = tx.GetPrivKey(rct.MyPrivateViewKey, rct.MyPrivateSpendKey)
-                    spent = contract.functions.key_images(CompressPoint(KeyImage(priv_key))).call()
-
-                    if (spent):
-                        rct.MarkUTXOAsSpent(len(rct.MyUTXOPool)-1)
+                rows.append(row)
+
+    #Expand every compressed point of the file in one batch (kept expanded by the transactions)
+    compressed = []
+    for row in rows:
+        compressed += [int(row[0],16), int(row[1],16)]
+        try:
+            int(row[2],10)
+        except ValueError:
+            compressed += [int(row[2],16)]
+
+    points = ExpandPoints(compressed)
+    k = 0
+
+    for row in rows:
+        pub_key = points[k]
+        dhe_point = points[k+1]
+        k += 2
+
+        try:
+            c_value = int(row[2],10)
+            tx = StealthTransaction(pub_key, dhe_point, c_value, compact=False)
+        except ValueError:
+            c_value = points[k]
+            k += 1
+            encrypted_data = PCAESMessage(int_to_bytes64(int(row[3],16)), int_to_bytes16(int(row[4],16)))
+            tx = StealthTransaction(pub_key, dhe_point, c_value, encrypted_data, compact=False)
+
+        (owned, duplicate) = rct.AddTx(tx)
+        if (owned and not duplicate):
+            priv_key = tx.GetPrivKey(rct.MyPrivateViewKey, rct.MyPrivateSpendKey)
+            spent = contract.functions.key_images(CompressPoint(KeyImage(priv_key))).call()
+
+            if (spent):
+                rct.MarkUTXOAsSpent(len(rct.MyUTXOPool)-1)
                     
 except FileNotFoundError:
     print("UTXO file not found, starting import at block 0")
@@ -192,7 +210,7 @@ with open("utxo.csv", "w") as file:
         row_data = [bytes_to_str(CompressPoint(rct.MyUTXOPool[i].pub_key)),
                     bytes_to_str(CompressPoint(rct.MyUTXOPool[i].dhe_point))]
 
-        if (type(rct.MyUTXOPool[i].c_value) == tuple):
+        if (is_point(rct.MyUTXOPool[i].c_value)):
             row_data += [bytes_to_str(CompressPoint(rct.MyUTXOPool[i].c_value))]
         else:
             row_data += [str(rct.MyUTXOPool[i].c_value)]
@@ -212,7 +230,7 @@ with open("utxo.csv", "w") as file:
         row_data = [bytes_to_str(CompressPoint(rct.MixinTxPool[i].pub_key)),
                     bytes_to_str(CompressPoint(rct.MixinTxPool[i].dhe_point))]
 
-        if (type(rct.MixinTxPool[i].c_value) == tuple):
+        if (is_point(rct.MixinTxPool[i].c_value)):
             row_data += [bytes_to_str(CompressPoint(rct.MixinTxPool[i].c_value))]
         else:
             row_data += [str(rct.MixinTxPool[i].c_value)]
@@ -0,0 +1,86 @@
+#Offline signing nonces
+#Starting an MLSAG ring for a key with public key P takes a random alpha, alpha*G1 and alpha*Hp(P),
+#none of which depend on the message.  A NoncePool computes these ahead of time (e.g. from a
+#background thread while a wallet is idle) so that signing only has to look them up.
+#Each nonce is handed out once: Take() removes it from the pool.  Pools are emptied when used from a
+#forked process and cannot be pickled, so nonces never leave the process that made them.
+import os
+import threading
+from util import *
+
+class NoncePool:
+    def __init__(self, P, size=8):
+        self.Hp = hash_to_point(P)
+        self.size = size
+        self.nonces = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.thread = None
+
+    def __reduce__(self):
+        raise TypeError("NoncePool holds secret nonces and cannot be pickled")
+
+    #Call with self.lock held
+    def _check_pid(self):
+        if (self.pid != os.getpid()):
+            self.pid = os.getpid()
+            self.nonces = []
+
+    def Count(self):
+        with self.lock:
+            self._check_pid()
+            return len(self.nonces)
+
+    #Adds nonces until the pool holds size of them
+    def Fill(self):
+        count = self.size - self.Count()
+        if (count <= 0): return
+
+        alpha = getRandomVector(count)
+        L = [MultiplyG1(a) for a in alpha]
+        R = [multiply(self.Hp, a) for a in alpha]
+        batch_normalize(L + R)
+
+        with self.lock:
+            self._check_pid()
+            for i in range(0, count):
+                if (len(self.nonces) < self.size):
+                    self.nonces.append((alpha[i], L[i], R[i]))
+
+    #Runs Fill() on a background (daemon) thread, returns the thread
+    def FillBackground(self):
+        with self.lock:
+            if (self.thread == None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self.Fill, daemon=True)
+                self.thread.start()
+
+            return self.thread
+
+    #Removes and returns a nonce (alpha, alpha*G1, alpha*Hp(P)), None if the pool is empty
+    def Take(self):
+        with self.lock:
+            self._check_pid()
+            if (len(self.nonces) == 0): return None
+            return self.nonces.pop()
+
+    #Discards all nonces (e.g. once the key's UTXO is spent)
+    def Clear(self):
+        with self.lock:
+            self.nonces = []
+
+def NoncePool_Test(size=4):
+    x = getRandom()
+    pool = NoncePool(MultiplyG1(x), size)
+    pool.FillBackground().join()
+
+    passed = (pool.Count() == size)
+    seen = set()
+    for i in range(0, size):
+        (alpha, L, R) = pool.Take()
+        passed = passed and (alpha not in seen)
+        passed = passed and eq(L, MultiplyG1(alpha)) and eq(R, multiply(hash_to_point(MultiplyG1(x)), alpha))
+        seen.add(alpha)
+
+    passed = passed and (pool.Take() == None)
+    print("NoncePool Test => " + ("Success!" if passed else "Failure!"))
+    return passed
@@ -6,10 +6,19 @@ from optimized_field_elements import (
     field_modulus,
     FQ,
 )
+from g1point import (
+    G1Point,
+    batch_affine,
+    g1point_from_affine,
+    to_g1point,
+)
+import curve_kernel as _kernel
 
 
 curve_order = 21888242871839275222246405745257275088548364400416034343698204186575808495617
 
+assert curve_order == _kernel.R
+
 # Curve order should be prime
 assert pow(2, curve_order, curve_order) == 2
 # Curve order should be a factor of field_modulus**12 - 1
@@ -23,7 +32,7 @@ b2 = FQ2([3, 0]) / FQ2([9, 1])
 b12 = FQ12([3] + [0] * 11)
 
 # Generator for curve over FQ
-G1 = (FQ(1), FQ(2), FQ(1))
+G1 = G1Point(FQ(1), FQ(2), FQ(1))
 # Generator for twisted curve over FQ2
 G2 = (
     FQ2([
@@ -57,6 +66,20 @@ assert is_on_curve(G2, b2)
 
 # Elliptic curve doubling
 def double(pt):
+    if not isinstance(pt[0], FQ):
+        return double_fqp(pt)
+    return _kernel.from_raw(_kernel.double(_kernel.to_raw(pt)))
+
+
+# Elliptic curve addition
+def add(p1, p2):
+    if not isinstance(p1[0], FQ):
+        return add_fqp(p1, p2)
+    return _kernel.from_raw(_kernel.add(_kernel.to_raw(p1), _kernel.to_raw(p2)))
+
+
+# Elliptic curve doubling over extension fields (FQ2, FQ12)
+def double_fqp(pt):
     x, y, z = pt
     W = 3 * x * x
     S = y * z
@@ -69,8 +92,8 @@ def double(pt):
     return newx, newy, newz
 
 
-# Elliptic curve addition
-def add(p1, p2):
+# Elliptic curve addition over extension fields (FQ2, FQ12)
+def add_fqp(p1, p2):
     one, zero = p1[0].__class__.one(), p1[0].__class__.zero()
     if p1[2] == zero or p2[2] == zero:
         return p1 if p2[2] == zero else p2
@@ -81,7 +104,7 @@ def add(p1, p2):
     V1 = x2 * z1
     V2 = x1 * z2
     if V1 == V2 and U1 == U2:
-        return double(p1)
+        return double_fqp(p1)
     elif V1 == V2:
         return (one, one, zero)
     U = U1 - U2
@@ -112,14 +135,25 @@ def multiply_naive(pt, n):
 def eq(p1, p2):
     x1, y1, z1 = p1
     x2, y2, z2 = p2
+    if isinstance(x1, FQ) and isinstance(x2, FQ):
+        return _kernel.eq(_kernel.to_raw(p1), _kernel.to_raw(p2))
     return x1 * z2 == x2 * z1 and y1 * z2 == y2 * z1
 
 
 def normalize(pt):
     x, y, z = pt
+    if isinstance(x, FQ):
+        #One (cached) inversion
+        ax, ay = to_g1point(pt).affine()
+        return (FQ(ax), FQ(ay))
     return (x / z, y / z)
 
 
+# normalize() for a list of G1 points, sharing a single inversion
+def batch_normalize(points):
+    return [(FQ(x), FQ(y)) for (x, y) in batch_affine(points)]
+
+
 # "Twist" a point in E(FQ2) into a point in E(FQ12)
 w = FQ12([0, 1] + [0] * 10)
 
@@ -129,6 +163,8 @@ def neg(pt):
     if pt is None:
         return None
     x, y, z = pt
+    if isinstance(pt, G1Point):
+        return G1Point(x, -y, z)
     return (x, -y, z)
 
 
@@ -146,6 +182,21 @@ def twist(pt):
     return (nx * w ** 2, ny * w**3, nz)
 
 
-# Check that the twist creates a point that is on the curve
-G12 = twist(G2)
-assert is_on_curve(G12, b12)
+# G12 = twist(G2), built on first use through GetG12() or the module attribute G12
+_G12 = None
+
+
+def GetG12():
+    global _G12
+    if _G12 is None:
+        G12 = twist(G2)
+        # Check that the twist creates a point that is on the curve
+        assert is_on_curve(G12, b12)
+        _G12 = G12
+    return _G12
+
+
+def __getattr__(name):
+    if name == "G12":
+        return GetG12()
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
@@ -1,50 +1,54 @@
 from __future__ import absolute_import
 
-import sys
+from bigint import (
+    mpz,
+    invert,
+    batch_invert,
+    powmod,
+    int_types,
+)
 
 
 field_modulus = 21888242871839275222246405745257275088696311157297823662689037894645226208583
+# field_modulus as a backend (gmpy2 / python) integer, used by FQ arithmetic
+_field_modulus = mpz(field_modulus)
 FQ12_modulus_coeffs = [82, 0, 0, 0, 0, 0, -18, 0, 0, 0, 0, 0]  # Implied + [1]
 FQ12_mc_tuples = [(i, c) for i, c in enumerate(FQ12_modulus_coeffs) if c]
 
-# python3 compatibility
-if sys.version_info.major == 2:
-    int_types = (int, long)  # noqa: F821
-else:
-    int_types = (int,)
 
-
-# Extended euclidean algorithm to find modular inverses for
-# integers
+# Modular inverses for integers (gmpy2.invert or pow(a, -1, n),
+# see bigint.py); returns 0 for a == 0
 def prime_field_inv(a, n):
-    if a == 0:
-        return 0
-    lm, hm = 1, 0
-    low, high = a % n, n
-    while low > 1:
-        r = high // low
-        nm, new = hm - lm * r, high - low * r
-        lm, low, hm, high = nm, new, lm, low
-    return lm % n
+    return invert(a, n)
+
+
+# Modular inverses of a list of FQ elements with a single inversion
+# (Montgomery's trick, see bigint.batch_invert); zeros map to zero
+def batch_inv(values):
+    inv = batch_invert([v.n for v in values], _field_modulus)
+    return [_fq(x) for x in inv]
 
 
 # A class for field elements in FQ. Wrap a number in this class,
 # and it becomes a field element.
+# FQ objects are immutable; __slots__ keeps each one to a single reference.
 class FQ(object):
+    __slots__ = ("n",)
+
     def __init__(self, n):
-        if isinstance(n, self.__class__):
+        if isinstance(n, FQ):
             self.n = n.n
         else:
-            self.n = n % field_modulus
+            self.n = n % _field_modulus
         assert isinstance(self.n, int_types)
 
     def __add__(self, other):
         on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n + on) % field_modulus)
+        return _fq((self.n + on) % _field_modulus)
 
     def __mul__(self, other):
         on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n * on) % field_modulus)
+        return _fq((self.n * on) % _field_modulus)
 
     def __rmul__(self, other):
         return self * other
@@ -54,16 +58,16 @@ class FQ(object):
 
     def __rsub__(self, other):
         on = other.n if isinstance(other, FQ) else other
-        return FQ((on - self.n) % field_modulus)
+        return _fq((on - self.n) % _field_modulus)
 
     def __sub__(self, other):
         on = other.n if isinstance(other, FQ) else other
-        return FQ((self.n - on) % field_modulus)
+        return _fq((self.n - on) % _field_modulus)
 
     def __div__(self, other):
         on = other.n if isinstance(other, FQ) else other
         assert isinstance(on, int_types)
-        return FQ(self.n * prime_field_inv(on, field_modulus) % field_modulus)
+        return _fq(self.n * prime_field_inv(on, _field_modulus) % _field_modulus)
 
     def __truediv__(self, other):
         return self.__div__(other)
@@ -71,20 +75,18 @@ class FQ(object):
     def __rdiv__(self, other):
         on = other.n if isinstance(other, FQ) else other
         assert isinstance(on, int_types), on
-        return FQ(prime_field_inv(self.n, field_modulus) * on % field_modulus)
+        return _fq(prime_field_inv(self.n, _field_modulus) * on % _field_modulus)
 
     def __rtruediv__(self, other):
         return self.__rdiv__(other)
 
     def __pow__(self, other):
         if other == 0:
-            return FQ(1)
+            return _FQ_ONE
         elif other == 1:
-            return FQ(self.n)
-        elif other % 2 == 0:
-            return (self * self) ** (other // 2)
+            return self
         else:
-            return ((self * self) ** int(other // 2)) * self
+            return _fq(powmod(self.n, other, _field_modulus))
 
     def __eq__(self, other):
         if isinstance(other, FQ):
@@ -96,18 +98,32 @@ class FQ(object):
         return not self == other
 
     def __neg__(self):
-        return FQ(-self.n)
+        return _fq(-self.n % _field_modulus)
 
     def __repr__(self):
         return repr(self.n)
 
     @classmethod
     def one(cls):
-        return cls(1)
+        return _FQ_ONE if cls is FQ else cls(1)
 
     @classmethod
     def zero(cls):
-        return cls(0)
+        return _FQ_ZERO if cls is FQ else cls(0)
+
+
+_new = object.__new__
+
+
+# Unchecked constructor for values already reduced mod field_modulus
+def _fq(n):
+    x = _new(FQ)
+    x.n = n
+    return x
+
+
+_FQ_ONE = FQ(1)
+_FQ_ZERO = FQ(0)
 
 
 # Utility methods for polynomial math
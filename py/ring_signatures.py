@@ -1,18 +1,173 @@
 from util import *
+import util
 import sha3
 
+#Flag True to evaluate MLSAG rows in lock-step (one column of every row at a time, with the
+#2m points of each column normalized by a single shared inversion before hashing)
+useLockStep = True
+
+#Process-parallel rows
+#The rows of an MSAG / MLSAG only meet in the c1 hash, so each row's chain of ring segments can be
+#computed by its own worker.  Pass an executor (e.g. concurrent.futures.ProcessPoolExecutor) to
+#Sign() or Verify() to do so, signatures with fewer than parallelRingThreshold keys (m*n) are always
+#computed serially.  Points are sent to and from the workers as affine integers.
+parallelRingThreshold = 32
+
+#Batches passed to MLSAG.VerifyBatch() with an executor and at least verifyBatchPoolThreshold
+#signatures are split between its workers (one chunk per CPU)
+verifyBatchPoolThreshold = 8
+
+def _use_executor(executor, m, n):
+    return (executor != None) and (m > 1) and (m*n >= parallelRingThreshold)
+
+def _affine_points(points):
+    return [tuple(a) for a in batch_affine(points)]
+
+def _from_affine(a):
+    if (a[0] == 0 and a[1] == 0): return NullPoint
+    return g1point_from_affine(a[0], a[1])
+
+#Worker: one MSAG row, returns the affine last point of the chain (not hashed) or None if s is empty
+#The chain starts at c value ck, or at a new ring if alpha is given
+def _msag_row(msgHash, ck, s, P, alpha=None):
+    point = None
+    if (alpha != None):
+        point = MSAG.StartRing_NoHash(alpha)
+
+    for j in range(0, len(s)):
+        if (point != None):
+            ck = MSAG.RingHashFunction(msgHash, point)
+        point = MSAG.CalculateRingSegment_NoHash(ck, s[j], _from_affine(P[j]))
+
+    if (point == None): return None
+    return _affine_points([point])[0]
+
+#Worker: one MLSAG row, returns the affine last (left, right) of the chain (not hashed) or None if s is empty
+#The chain starts at c value ck, or at a new ring (alpha, Hp(P) of the private key's public key) if alpha is given
+#(or at the affine start segment, if it was precomputed)
+def _mlsag_row(msgHash, ck, s, P, I, alpha=None, Hp=None, start=None):
+    I = _from_affine(I)
+    segment = None
+    if (start != None):
+        segment = (_from_affine(start[0]), _from_affine(start[1]))
+    elif (alpha != None):
+        segment = MLSAG.StartLinkableRing_NoHash(alpha, None, _from_affine(Hp))
+
+    for j in range(0, len(s)):
+        if (segment != None):
+            ck = MLSAG.LinkableRingHashFunction(msgHash, segment[0], segment[1])
+        segment = MLSAG.CalculateLinkableRingSegment_NoHash(ck, s[j], _from_affine(P[j]), I)
+
+    if (segment == None): return None
+    return _affine_points(segment)
+
+#Precomputes the bases MLSAG.Verify() of sigs uses more than once: Hp(P) of ring members shared
+#between signatures, and wNAF tables for those P and Hp(P) and for the key images I (each used once
+#per ring member), most used first and as many as the caches hold
+def _mlsag_precompute(sigs):
+    uses = {}
+    bases = []
+    for sig in sigs:
+        for i in range(0, len(sig.pub_keys)):
+            key = sig.pub_keys.Compressed(i)
+            if (key != 0):
+                uses[key] = uses.get(key, 0) + 1
+
+        n = len(sig.pub_keys) // max(len(sig.key_images), 1)
+        for i in range(0, len(sig.key_images)):
+            key = sig.key_images.Compressed(i)
+            if (key != 0):
+                bases += [(n, LazyG1Point(key))]
+
+    shared = [(count, key) for (key, count) in uses.items() if count > 1]
+    shared.sort(key=lambda entry: -entry[0])
+    for (count, key) in shared[:util.hashToPointCacheSize]:
+        P = LazyG1Point(key)
+        bases += [(count, P), (count, hash_to_point(P))]
+
+    bases.sort(key=lambda entry: -entry[0])
+    for (count, P) in bases[:util.precompTableCacheSize]:
+        GetPrecomputedTable(*PointKey(P))
+
+#Worker: MLSAG.VerifyBatch() of a list of signatures within one process
+def _mlsag_verify_chunk(sigs):
+    _mlsag_precompute(sigs)
+    return [sig.Verify() for sig in sigs]
+
+#Signing Context
+#What signing derives from a private key xk: its public key P = xk*G1, Hp(P) and the key image
+#I = xk*Hp(P), each computed once (Hp and I on first use).  A public key the caller already knows (e.g. a wallet's UTXO) can be
+#passed in as P.  RingCT inputs also carry the commitment bf*G1 + v*H of the output being spent.
+#With a noncePool (see noncepool.py) for P, rings are started from its precomputed nonces.
+class SigningContext:
+    def __init__(self, xk, P=None, v=None, bf=0, commitment=None, noncePool=None):
+        if (P == None):
+            P = MultiplyG1(xk)
+
+        self.xk = xk
+        self.P = P
+        self._Hp = None
+        self._I = None
+
+        if (commitment == None and v != None):
+            commitment = CommitG1H(bf, v)
+
+        self.v = v
+        self.bf = bf
+        self.commitment = commitment
+
+        assert(noncePool == None or CompressPoint(noncePool.Hp) == CompressPoint(self.Hp))
+        self.noncePool = noncePool
+        self.starts = {}
+
+    @property
+    def Hp(self):
+        if (self._Hp == None):
+            self._Hp = hash_to_point(self.P)
+        return self._Hp
+
+    @property
+    def I(self):
+        if (self._I == None):
+            self._I = multiply(self.Hp, self.xk)
+        return self._I
+
+    #Draws alpha for a new ring from the nonce pool, None if there is no pool or it is empty
+    def NextNonce(self):
+        if (self.noncePool == None): return None
+
+        nonce = self.noncePool.Take()
+        if (nonce == None): return None
+
+        (alpha, L, R) = nonce
+        self.starts[alpha] = (L, R)
+        return alpha
+
+    #(alpha*G1, alpha*Hp(P)) if alpha came from NextNonce() and is not used yet, otherwise None
+    def PrecomputedStart(self, alpha):
+        return self.starts.pop(alpha, None)
+
+    #(alpha*G1, alpha*Hp(P)), the start of a new ring
+    def StartRing(self, alpha):
+        start = self.PrecomputedStart(alpha)
+        if (start == None):
+            start = MLSAG.StartLinkableRing_NoHash(alpha, self.P, self.Hp)
+
+        return start
+
+#Returns xk as a list of SigningContext (private keys are wrapped, contexts are kept)
+def SigningContexts(xk):
+    return [x if isinstance(x, SigningContext) else SigningContext(x) for x in xk]
+
 #Ring Signature Functions
 class MSAG:
-    msgHash = 0
-    m = 0
-    pub_keys = []
-    signature = []
+    __slots__ = ("msgHash", "m", "pub_keys", "signature")
 
     def __init__(self, msgHash, m, pub_keys, signature):
         self.msgHash = msgHash
         self.m = m
-        self.pub_keys = pub_keys
-        self.signature = signature
+        self.pub_keys = PointVector(pub_keys)
+        self.signature = ScalarVector(signature)
 
     def RingHashFunction(msgHash, point):
         hasher = sha3.keccak_256()
@@ -21,7 +176,7 @@ class MSAG:
         return bytes_to_int(hasher.digest())
 
     def StartRing_NoHash(alpha):
-        point = multiply(G1, alpha)
+        point = MultiplyG1(alpha)
         return point
 
     def StartRing(msgHash, alpha):
@@ -29,10 +184,7 @@ class MSAG:
         return MSAG.RingHashFunction(msgHash, point)
 
     def CalculateRingSegment_NoHash(ck, sk, P):
-        point = multiply(G1, sk)
-        temp = multiply(P, ck)
-        point = add(point, temp)
-
+        point = CommitG1P(sk, P, ck)
         return point
 
     def CalculateRingSegment(msgHash, ck, sk, P):
@@ -69,7 +221,7 @@ class MSAG:
             indices[i] = indices[i] % n
 
             #Store public key for known private key
-            Pout[m*indices[i]+i] = multiply(G1, xk[i])
+            Pout[m*indices[i]+i] = MultiplyG1(xk[i])
             
             if (indices[i] == (n-1)):
                 point = MSAG.StartRing_NoHash(random[m*indices[i]+i])
@@ -146,21 +298,22 @@ class MSAG:
         n = (len(Pin) // m) + 1
         
         #Create Random Numbers
-        random = []
-        for i in range(0, (m*n)):
-            random = random + [getRandom()]
+        random = getRandomVector(m*n)
 
         return MSAG.Sign_CompactPin(msgHash, m, xk, indices, random)
 
     #Pin is an n x m array.  The elements corrosponding to xk in the array don't count however.
     #These keys are calculated from xk and substituted in at the appropriate time.
-    def Sign(m, msgHash, xk, indices, Pin, random):
+    def Sign(m, msgHash, xk, indices, Pin, random, executor=None):
         assert(len(xk) == m)
         assert(len(indices) == m)
         assert( (len(Pin) % m ) == 0)
         n = (len(Pin) // m)
         assert( len(random) == m*n )
 
+        if (_use_executor(executor, m, n)):
+            return MSAG.Sign_Parallel(m, msgHash, xk, indices, Pin, random, executor)
+
         #Initialize Output Arrays
         Pout = [0]*(m*n)
         signature = [0]*(m*n+1)
@@ -176,7 +329,7 @@ class MSAG:
             indices[i] = indices[i] % n
 
             #Store public key for known private key
-            Pout[m*indices[i]+i] = multiply(G1, xk[i])
+            Pout[m*indices[i]+i] = MultiplyG1(xk[i])
             
             if (indices[i] == (n-1)):
                 point = MSAG.StartRing_NoHash(random[m*indices[i]+i])
@@ -242,20 +395,77 @@ class MSAG:
 
         return MSAG(msgHash, m, Pout, signature)
 
-    def Sign_GenRandom(m, msgHash, xk, indices, Pin):
+    #Same as Sign(), with each ring's chain computed by executor (see _msag_row)
+    def Sign_Parallel(m, msgHash, xk, indices, Pin, random, executor):
+        assert(len(xk) == m)
+        assert(len(indices) == m)
+        assert( (len(Pin) % m ) == 0)
+        n = (len(Pin) // m)
+        assert( len(random) == m*n )
+
+        #Initialize Output Arrays
+        Pout = [0]*(m*n)
+        signature = [0]*(m*n+1)
+
+        #Store public keys for known private keys
+        for i in range(0, m):
+            indices[i] = indices[i] % n
+            Pout[m*indices[i]+i] = MultiplyG1(xk[i])
+
+        #Store public keys and s values of the other ring members
+        for index in range(0, m*n):
+            if ((index // m) != indices[index % m]):
+                Pout[index] = Pin[index]
+                signature[index+1] = random[index]
+
+        A = _affine_points(Pout)
+
+        #Calulate 1st half of all rings (for c1 calculation)
+        jobs = []
+        for i in range(0, m):
+            cols = range(indices[i]+1, n)
+            jobs.append(executor.submit(_msag_row, msgHash, 0, [random[m*j+i] for j in cols], [A[m*j+i] for j in cols],
+                                        random[m*indices[i]+i]))
+
+        #Merge ring ends into c1 hash in row order
+        hasher = sha3.keccak_256()
+        hasher.update(int_to_bytes32(2*m+1))
+        hasher.update(msgHash)
+        for job in jobs:
+            hasher = add_point_to_hasher(hasher, g1point_from_affine(*job.result()))
+
+        signature[0] = bytes_to_int(hasher.digest())
+
+        #Calculate 2nd half of each ring
+        jobs = []
+        for i in range(0, m):
+            cols = range(0, indices[i])
+            jobs.append(executor.submit(_msag_row, msgHash, signature[0], [random[m*j+i] for j in cols], [A[m*j+i] for j in cols]))
+
+        for i in range(0, m):
+            ck = signature[0]
+            point = jobs[i].result()
+            if (point != None):
+                ck = MSAG.RingHashFunction(msgHash, g1point_from_affine(*point))
+
+            #Close Ring
+            index = m*indices[i] + i
+            signature[index+1] = MSAG.CompleteRing(random[index], ck, xk[i])
+
+        return MSAG(msgHash, m, Pout, signature)
+
+    def Sign_GenRandom(m, msgHash, xk, indices, Pin, executor=None):
         assert(len(xk) == m)
         assert(len(indices) == m)
         assert( (len(Pin) % m ) == 0)
         n = (len(Pin) // m)
         
         #Create Random Numbers
-        random = []
-        for i in range(0, (m*n)):
-            random = random + [getRandom()]
+        random = getRandomVector(m*n)
 
-        return MSAG.Sign(m, msgHash, xk, indices, Pin, random)
+        return MSAG.Sign(m, msgHash, xk, indices, Pin, random, executor)
 
-    def Verify(self):
+    def Verify(self, executor=None):
         #Check input parameter lengths
         m = self.m
         if (m == 0): return False
@@ -264,31 +474,48 @@ class MSAG:
         if (n == 0): return False
         if (len(self.signature) != (m*n+1)): return False
 
+        #Decode the keys and scalars once (see PointVector, ScalarVector)
+        (pub_keys, signature) = (list(self.pub_keys), list(self.signature))
+
         #Initialize c1 hasher (total length of array + message hash)
         hasher = sha3.keccak_256()
         hasher.update(int_to_bytes32(2*m+1))
         hasher.update(self.msgHash)
 
+        #Calculate Rings in parallel, then merge ring ends into c1 hash in row order
+        if (_use_executor(executor, m, n)):
+            A = _affine_points(pub_keys)
+            jobs = [executor.submit(_msag_row, self.msgHash, signature[0], [signature[m*j+i+1] for j in range(0, n)],
+                                    [A[m*j+i] for j in range(0, n)]) for i in range(0, m)]
+            for job in jobs:
+                hasher = add_point_to_hasher(hasher, g1point_from_affine(*job.result()))
+
+            ck = bytes_to_int(hasher.digest())
+            return (signature[0] == ck)
+
         #Calculate Rings
+        points = [None]*m
         for i in range(0, m):
             #Get c1
-            ck = self.signature[0]
+            ck = signature[0]
 
             #Calculate (n-1) ring segments
             for j in range(0, n-1):
                 index = m*j+i
-                ck = MSAG.CalculateRingSegment(self.msgHash, ck, self.signature[index+1], self.pub_keys[index])
+                ck = MSAG.CalculateRingSegment(self.msgHash, ck, signature[index+1], pub_keys[index])
 
             #Calculate last ring segment
             index = m*(n-1)+i
-            point = MSAG.CalculateRingSegment_NoHash(ck, self.signature[index+1], self.pub_keys[index])
+            points[i] = MSAG.CalculateRingSegment_NoHash(ck, signature[index+1], pub_keys[index])
 
-            #Update c1 hash
-            hasher = add_point_to_hasher(hasher, point)
+        #Update c1 hash (all ring ends normalized together)
+        batch_normalize(points)
+        for i in range(0, m):
+            hasher = add_point_to_hasher(hasher, points[i])
                 
         #Check if ring is closed
         ck = bytes_to_int(hasher.digest())
-        return (self.signature[0] == ck)
+        return (signature[0] == ck)
 
     def Print(self):
         print("MSAG Signature:")
@@ -305,42 +532,38 @@ class MSAG:
             print(hex(self.signature[i]))
 
 class MLSAG:
-    msgHash = 0
-    key_images = []
-    pub_keys =[]
-    signature = []
+    __slots__ = ("msgHash", "key_images", "pub_keys", "signature")
 
     def __init__(self, msgHash, key_images, pub_keys, signature):
         self.msgHash = msgHash
-        self.key_images = key_images
-        self.pub_keys = pub_keys
-        self.signature = signature
+        self.key_images = PointVector(key_images)
+        self.pub_keys = PointVector(pub_keys)
+        self.signature = ScalarVector(signature)
 
     def LinkableRingHashFunction(msgHash, left, right):
         hasher = sha3.keccak_256()
         hasher.update(msgHash)
+        batch_normalize([left, right])
         hasher = add_point_to_hasher(hasher, left)
         hasher = add_point_to_hasher(hasher, right)
         return bytes_to_int(hasher.digest())
 
-    def StartLinkableRing_NoHash(alpha, P):
-        Lout = multiply(G1, alpha)
-        Rout = multiply(hash_to_point(P), alpha)
+    #Hp = hash_to_point(P) if already known
+    def StartLinkableRing_NoHash(alpha, P, Hp=None):
+        if (Hp == None):
+            Hp = hash_to_point(P)
+
+        Lout = MultiplyG1(alpha)
+        Rout = multiply(Hp, alpha)
         return (Lout, Rout)
 
-    def StartLinkableRing(msgHash, alpha, P):
-        (left, right) = MLSAG.StartLinkableRing_NoHash(alpha, P)
+    def StartLinkableRing(msgHash, alpha, P, Hp=None):
+        (left, right) = MLSAG.StartLinkableRing_NoHash(alpha, P, Hp)
         return MLSAG.LinkableRingHashFunction(msgHash, left, right)
 
     def CalculateLinkableRingSegment_NoHash(ck, sk, P, I):
-        Lout = multiply(G1, sk)
-        temp = multiply(P, ck)
-        Lout = add(Lout, temp)
-
-        Rout = hash_to_point(P)
-        Rout = multiply(Rout, sk)
-        temp = multiply(I, ck)
-        Rout = add(Rout, temp)
+        Lout = CommitG1P(sk, P, ck)
+        Rout = MultiexpPrecomputed([hash_to_point(P), I], [sk, ck])
 
         return (Lout, Rout)
 
@@ -348,6 +571,12 @@ class MLSAG:
         (left, right) = MLSAG.CalculateLinkableRingSegment_NoHash(ck, sk, P, I)
         return MLSAG.LinkableRingHashFunction(msgHash, left, right)
 
+    #Hashes one column of ring segments, segments is a list of (left, right) pairs (one per row)
+    #All points are normalized together (one inversion), returns the list of next c values
+    def LinkableRingHashColumn(msgHash, segments):
+        batch_normalize([point for segment in segments for point in segment])
+        return [MLSAG.LinkableRingHashFunction(msgHash, left, right) for (left, right) in segments]
+
     def CompleteRing(alpha, c, xk):
         s = (c * xk) % Ncurve
         s = Ncurve - s
@@ -363,6 +592,9 @@ class MLSAG:
         n = (len(Pin) // m) + 1
         assert( len(random) == m*n )
 
+        #Public keys, Hp(P) and key images of the private keys
+        xk = SigningContexts(xk)
+
         #Initialize Output Arrays
         Pout = [0]*(m*n)
         signature = [0]*(m*n+1)
@@ -378,17 +610,18 @@ class MLSAG:
             #Make sure index is mod n
             indices[i] = indices[i] % n
 
-            #Calculate Key Image and Store for later use
-            keyImage = multiply(hash_to_point(multiply(G1,xk[i])), xk[i])
+            #Fetch Key Image and Store for later use
+            keyImage = xk[i].I
             I[i] = keyImage
 
             #Store public key for known private key
-            Pout[m*indices[i]+i] = multiply(G1, xk[i])
+            Pout[m*indices[i]+i] = xk[i].P
             
             if (indices[i] == (n-1)):
-                (left, right) = MLSAG.StartLinkableRing_NoHash(random[m*indices[i]+i], multiply(G1, xk[i]))
+                (left, right) = xk[i].StartRing(random[m*indices[i]+i])
             else:
-                ck = MLSAG.StartLinkableRing(msgHash, random[m*indices[i]+i], multiply(G1, xk[i]))
+                (left, right) = xk[i].StartRing(random[m*indices[i]+i])
+                ck = MLSAG.LinkableRingHashFunction(msgHash, left, right)
 
                 for j in range((indices[i]+1)%n,(n-1)):
                     #Calculate array index for easy reference
@@ -452,7 +685,7 @@ class MLSAG:
 
             #Close Ring
             index = m*indices[i] + i
-            signature[index+1] = MLSAG.CompleteRing(random[index], ck, xk[i])
+            signature[index+1] = MLSAG.CompleteRing(random[index], ck, xk[i].xk)
 
         return MLSAG(msgHash, I, Pout, signature)
 
@@ -464,21 +697,35 @@ class MLSAG:
         n = (len(Pin) // m) + 1
         
         #Create Random Numbers
-        random = []
-        for i in range(0, (m*n)):
-            random = random + [getRandom()]
+        random = getRandomVector(m*n)
+
+        #Start rings from precomputed nonces where available
+        xk = SigningContexts(xk)
+        for i in range(0, m):
+            alpha = xk[i].NextNonce()
+            if (alpha != None):
+                random[m*(indices[i] % n)+i] = alpha
 
         return MLSAG.Sign_CompactPin(m, msgHash, xk, indices, Pin, random)
 
     #Pin is an n x m array.  The elements corrosponding to xk in the array don't count however.
     #These keys are calculated from xk and substituted in at the appropriate time.
-    def Sign(m, msgHash, xk, indices, Pin, random):
+    def Sign(m, msgHash, xk, indices, Pin, random, executor=None):
         assert(len(xk) == m)
         assert(len(indices) == m)
         assert( (len(Pin) % m ) == 0)
         n = (len(Pin) // m)
         assert( len(random) == m*n )
 
+        #Public keys, Hp(P) and key images of the private keys
+        xk = SigningContexts(xk)
+
+        if (_use_executor(executor, m, n)):
+            return MLSAG.Sign_Parallel(m, msgHash, xk, indices, Pin, random, executor)
+
+        if (useLockStep):
+            return MLSAG.Sign_LockStep(m, msgHash, xk, indices, Pin, random)
+
         #Initialize Output Arrays
         Pout = [0]*(m*n)
         signature = [0]*(m*n+1)
@@ -494,17 +741,18 @@ class MLSAG:
             #Make sure index is mod n
             indices[i] = indices[i] % n
 
-            #Calculate Key Image and Store for later use
-            keyImage = multiply(hash_to_point(multiply(G1,xk[i])), xk[i])
+            #Fetch Key Image and Store for later use
+            keyImage = xk[i].I
             I[i] = keyImage
 
             #Store public key for known private key
-            Pout[m*indices[i]+i] = multiply(G1, xk[i])
+            Pout[m*indices[i]+i] = xk[i].P
             
             if (indices[i] == (n-1)):
-                (left, right) = MLSAG.StartLinkableRing_NoHash(random[m*indices[i]+i], multiply(G1, xk[i]))
+                (left, right) = xk[i].StartRing(random[m*indices[i]+i])
             else:
-                ck = MLSAG.StartLinkableRing(msgHash, random[m*indices[i]+i], multiply(G1, xk[i]))
+                (left, right) = xk[i].StartRing(random[m*indices[i]+i])
+                ck = MLSAG.LinkableRingHashFunction(msgHash, left, right)
 
                 for j in range((indices[i]+1)%n,(n-1)):
                     #Calculate array index for easy reference
@@ -565,25 +813,192 @@ class MLSAG:
 
             #Close Ring
             index = m*indices[i] + i
-            signature[index+1] = MLSAG.CompleteRing(random[index], ck, xk[i])
+            signature[index+1] = MLSAG.CompleteRing(random[index], ck, xk[i].xk)
+
+        return MLSAG(msgHash, I, Pout, signature)
+
+    #Same as Sign(), but advances all m rings one column at a time
+    #Each column's points are normalized with one inversion (see LinkableRingHashColumn)
+    def Sign_LockStep(m, msgHash, xk, indices, Pin, random):
+        assert(len(xk) == m)
+        assert(len(indices) == m)
+        assert( (len(Pin) % m ) == 0)
+        n = (len(Pin) // m)
+        assert( len(random) == m*n )
+
+        #Public keys, Hp(P) and key images of the private keys
+        xk = SigningContexts(xk)
+
+        #Initialize Output Arrays
+        Pout = [0]*(m*n)
+        signature = [0]*(m*n+1)
+        I = [0]*m
+
+        #Fetch Key Images and store public keys for known private keys
+        for i in range(0, m):
+            #Make sure index is mod n
+            indices[i] = indices[i] % n
+
+            Pout[m*indices[i]+i] = xk[i].P
+            I[i] = xk[i].I
+
+        #Calulate 1st half of all rings (for c1 calculation)
+        #Ring i starts at column indices[i] and runs to column n-1
+        ck = [0]*m
+        ends = [None]*m
+        for j in range(0, n):
+            rows = [i for i in range(0, m) if indices[i] <= j]
+            segments = []
+            for i in rows:
+                index = m*j+i
+                if (j == indices[i]):
+                    segments.append(xk[i].StartRing(random[index]))
+                else:
+                    #Extract input public key and store in output
+                    point = Pin[index]
+                    Pout[index] = point
+
+                    segments.append(MLSAG.CalculateLinkableRingSegment_NoHash(ck[i], random[index], point, I[i]))
+
+                    #Store s value
+                    signature[index+1] = random[index]
+
+            if (j == (n-1)):
+                for k in range(0, len(rows)):
+                    ends[rows[k]] = segments[k]
+            else:
+                c = MLSAG.LinkableRingHashColumn(msgHash, segments)
+                for k in range(0, len(rows)):
+                    ck[rows[k]] = c[k]
+
+        #Calculate c1 (total length of array + message hash + ring ends)
+        batch_normalize([point for segment in ends for point in segment])
+        hasher = sha3.keccak_256()
+        hasher.update(int_to_bytes32(4*m+1))
+        hasher.update(msgHash)
+        for (left, right) in ends:
+            hasher = add_point_to_hasher(hasher, left)
+            hasher = add_point_to_hasher(hasher, right)
+
+        signature[0] = bytes_to_int(hasher.digest())
+
+        #Calculate 2nd half of each ring (columns 0 to indices[i]-1 of ring i)
+        ck = [signature[0]]*m
+        for j in range(0, max(indices)):
+            rows = [i for i in range(0, m) if j < indices[i]]
+            segments = []
+            for i in rows:
+                index = m*j+i
+                point = Pin[index]
+                Pout[index] = point
+
+                segments.append(MLSAG.CalculateLinkableRingSegment_NoHash(ck[i], random[index], point, I[i]))
+
+                #Store s value
+                signature[index+1] = random[index]
+
+            c = MLSAG.LinkableRingHashColumn(msgHash, segments)
+            for k in range(0, len(rows)):
+                ck[rows[k]] = c[k]
+
+        #Close Rings
+        for i in range(0, m):
+            index = m*indices[i] + i
+            signature[index+1] = MLSAG.CompleteRing(random[index], ck[i], xk[i].xk)
+
+        return MLSAG(msgHash, I, Pout, signature)
+
+    #Same as Sign(), with each ring's chain computed by executor (see _mlsag_row)
+    def Sign_Parallel(m, msgHash, xk, indices, Pin, random, executor):
+        assert(len(xk) == m)
+        assert(len(indices) == m)
+        assert( (len(Pin) % m ) == 0)
+        n = (len(Pin) // m)
+        assert( len(random) == m*n )
+
+        #Public keys, Hp(P) and key images of the private keys
+        xk = SigningContexts(xk)
+
+        #Initialize Output Arrays
+        Pout = [0]*(m*n)
+        signature = [0]*(m*n+1)
+        I = [0]*m
+
+        #Fetch Key Images and store public keys for known private keys
+        for i in range(0, m):
+            indices[i] = indices[i] % n
+            Pout[m*indices[i]+i] = xk[i].P
+            I[i] = xk[i].I
+
+        #Store public keys and s values of the other ring members
+        for index in range(0, m*n):
+            if ((index // m) != indices[index % m]):
+                Pout[index] = Pin[index]
+                signature[index+1] = random[index]
+
+        A = _affine_points(Pout + I + [x.Hp for x in xk])
+
+        #Calulate 1st half of all rings (for c1 calculation)
+        jobs = []
+        for i in range(0, m):
+            index = m*indices[i]+i
+            cols = range(indices[i]+1, n)
+            start = xk[i].PrecomputedStart(random[index])
+            if (start != None):
+                start = _affine_points(start)
+
+            jobs.append(executor.submit(_mlsag_row, msgHash, 0, [random[m*j+i] for j in cols], [A[m*j+i] for j in cols],
+                                        A[m*n+i], random[index], A[m*n+m+i], start))
+
+        #Merge ring ends into c1 hash in row order
+        hasher = sha3.keccak_256()
+        hasher.update(int_to_bytes32(4*m+1))
+        hasher.update(msgHash)
+        for job in jobs:
+            for point in job.result():
+                hasher = add_point_to_hasher(hasher, g1point_from_affine(*point))
+
+        signature[0] = bytes_to_int(hasher.digest())
+
+        #Calculate 2nd half of each ring
+        jobs = []
+        for i in range(0, m):
+            cols = range(0, indices[i])
+            jobs.append(executor.submit(_mlsag_row, msgHash, signature[0], [random[m*j+i] for j in cols], [A[m*j+i] for j in cols],
+                                        A[m*n+i]))
+
+        for i in range(0, m):
+            ck = signature[0]
+            segment = jobs[i].result()
+            if (segment != None):
+                ck = MLSAG.LinkableRingHashFunction(msgHash, g1point_from_affine(*segment[0]), g1point_from_affine(*segment[1]))
+
+            #Close Ring
+            index = m*indices[i] + i
+            signature[index+1] = MLSAG.CompleteRing(random[index], ck, xk[i].xk)
 
         return MLSAG(msgHash, I, Pout, signature)
 
     #Create Random Numbers before signing
-    def Sign_GenRandom(m, msgHash, xk, indices, Pin):
+    def Sign_GenRandom(m, msgHash, xk, indices, Pin, executor=None):
         assert(len(xk) == m)
         assert(len(indices) == m)
         assert( (len(Pin) % m ) == 0)
         n = (len(Pin) // m)
         
         #Create random numbers
-        random = []
-        for i in range(0, (m*n)):
-            random = random + [getRandom()]
+        random = getRandomVector(m*n)
+
+        #Start rings from precomputed nonces where available
+        xk = SigningContexts(xk)
+        for i in range(0, m):
+            alpha = xk[i].NextNonce()
+            if (alpha != None):
+                random[m*(indices[i] % n)+i] = alpha
 
-        return MLSAG.Sign(m, msgHash, xk, indices, Pin, random)
+        return MLSAG.Sign(m, msgHash, xk, indices, Pin, random, executor)
             
-    def Verify(self):
+    def Verify(self, executor=None):
         #Check input parameter lengths
         m = len(self.key_images)
         if (m == 0): return False
@@ -592,32 +1007,89 @@ class MLSAG:
         if (n == 0): return False
         if (len(self.signature) != (m*n+1)): return False
 
+        #Decode the keys and scalars once
+        (pub_keys, key_images, signature) = (list(self.pub_keys), list(self.key_images), list(self.signature))
+
         #Initialize c1 hasher (total length of array + message hash)
         hasher = sha3.keccak_256()
         hasher.update(int_to_bytes32(4*m+1))
         hasher.update(self.msgHash)
 
+        #Calculate Rings in parallel, then merge ring ends into c1 hash in row order
+        if (_use_executor(executor, m, n)):
+            A = _affine_points(pub_keys + key_images)
+            jobs = [executor.submit(_mlsag_row, self.msgHash, signature[0], [signature[m*j+i+1] for j in range(0, n)],
+                                    [A[m*j+i] for j in range(0, n)], A[m*n+i]) for i in range(0, m)]
+            for job in jobs:
+                for point in job.result():
+                    hasher = add_point_to_hasher(hasher, g1point_from_affine(*point))
+
+            ck = bytes_to_int(hasher.digest())
+            return (signature[0] == ck)
+
         #Calculate Rings
+        if (useLockStep):
+            #All rings at once, one column at a time
+            ck = [signature[0]]*m
+            for j in range(0, n-1):
+                segments = [MLSAG.CalculateLinkableRingSegment_NoHash(ck[i], signature[m*j+i+1], pub_keys[m*j+i], key_images[i])
+                            for i in range(0, m)]
+                ck = MLSAG.LinkableRingHashColumn(self.msgHash, segments)
+
+            #Calculate last ring segments, then update c1 hash
+            j = n-1
+            points = []
+            for i in range(0, m):
+                points += MLSAG.CalculateLinkableRingSegment_NoHash(ck[i], signature[m*j+i+1], pub_keys[m*j+i], key_images[i])
+
+            batch_normalize(points)
+            for i in range(0, 2*m):
+                hasher = add_point_to_hasher(hasher, points[i])
+
+            #Check if ring is closed
+            ck = bytes_to_int(hasher.digest())
+            return (signature[0] == ck)
+
+        points = [None]*(2*m)
         for i in range(0, m):
             #Get c1
-            ck = self.signature[0]
+            ck = signature[0]
 
             #Calculate (n-1) ring segments
             for j in range(0, n-1):
                 index = m*j+i
-                ck = MLSAG.CalculateLinkableRingSegment(self.msgHash, ck, self.signature[index+1], self.pub_keys[index], self.key_images[i])
+                ck = MLSAG.CalculateLinkableRingSegment(self.msgHash, ck, signature[index+1], pub_keys[index], key_images[i])
 
             #Calculate last ring segment
             index = m*(n-1)+i
-            (left, right) = MLSAG.CalculateLinkableRingSegment_NoHash(ck, self.signature[index+1], self.pub_keys[index], self.key_images[i])
+            (points[2*i], points[2*i+1]) = MLSAG.CalculateLinkableRingSegment_NoHash(ck, signature[index+1], pub_keys[index], key_images[i])
 
-            #Update c1 hash
-            hasher = add_point_to_hasher(hasher, left)
-            hasher = add_point_to_hasher(hasher, right)
+        #Update c1 hash (all ring ends normalized together)
+        batch_normalize(points)
+        for i in range(0, 2*m):
+            hasher = add_point_to_hasher(hasher, points[i])
                 
         #Check if ring is closed
         ck = bytes_to_int(hasher.digest())
-        return (self.signature[0] == ck)
+        return (signature[0] == ck)
+
+    #Verifies a list of signatures, returns a list of results (True / False for each signature)
+    #Bases used more than once (shared ring members, their Hp(P) and the key images) are precomputed
+    #up front, see _mlsag_precompute().  Pass an executor (e.g. concurrent.futures.ProcessPoolExecutor)
+    #to split batches of at least verifyBatchPoolThreshold signatures between its workers, each of
+    #which precomputes for its own chunk (a long-lived pool keeps its tables between calls).
+    def VerifyBatch(sigs, executor=None):
+        if (executor == None or len(sigs) < verifyBatchPoolThreshold):
+            return _mlsag_verify_chunk(sigs)
+
+        import os
+        chunk = (len(sigs) + (os.cpu_count() or 1) - 1) // (os.cpu_count() or 1)
+        chunks = [sigs[j:j+chunk] for j in range(0, len(sigs), chunk)]
+        results = []
+        for result in executor.map(_mlsag_verify_chunk, chunks):
+            results += result
+
+        return results
 
     def Print(self):
         print("MLSAG Signature:")
@@ -637,21 +1109,187 @@ class MLSAG:
         for i in range(0, len(self.signature)):
             print(hex(self.signature[i]))
 
+#CLSAG (Concise Linkable Spontaneous Anonymous Group) signatures, Goodell, Noether and Blue (2019)
+#Ring member j is a column of m keys pub_keys[m*j+i] (laid out as for MLSAG) and the signer knows the
+#m private keys of one column.  The rows are aggregated with hash coefficients mu_i into one key per
+#member, so the ring closes with a single s value per member: the signature is (c1, s1, ..., sn).
+#key_images[0] = xk[0]*Hp(P[0]) links signatures, the others xk[i]*Hp(P[0]) are auxiliary (e.g. for
+#a commitment row) and only link together with key_images[0].
+class CLSAG:
+    __slots__ = ("msgHash", "key_images", "pub_keys", "signature")
+
+    def __init__(self, msgHash, key_images, pub_keys, signature):
+        self.msgHash = msgHash
+        self.key_images = PointVector(key_images)
+        self.pub_keys = PointVector(pub_keys)
+        self.signature = ScalarVector(signature)
+
+    #Returns the aggregation coefficients mu_0 ... mu_(m-1) and the prefix of the ring hash,
+    #both bound to every key and key image
+    def RingHash(msgHash, pub_keys, key_images):
+        hasher = sha3.keccak_256()
+        hasher.update(int_to_bytes32(len(key_images)))
+        for point in (pub_keys + key_images):
+            hasher = add_point_to_hasher(hasher, point)
+        ringHash = hasher.digest()
+
+        mu = []
+        for i in range(0, len(key_images)):
+            hasher = sha3.keccak_256(b"CLSAG_agg")
+            hasher.update(int_to_bytes32(i))
+            hasher.update(ringHash)
+            mu.append(bytes_to_int(hasher.digest()) % Ncurve)
+
+        return (mu, b"CLSAG_round" + ringHash + msgHash)
+
+    def RingHashFunction(prefix, left, right):
+        hasher = sha3.keccak_256()
+        hasher.update(prefix)
+        batch_normalize([left, right])
+        hasher = add_point_to_hasher(hasher, left)
+        hasher = add_point_to_hasher(hasher, right)
+        return bytes_to_int(hasher.digest())
+
+    #P is the member's column of keys, W_I = sum(mu_i*key_images[i])
+    def CalculateRingSegment_NoHash(ck, sk, P, mu, W_I):
+        Lout = multiexp([G1] + P, [sk] + [(ck * x) % Ncurve for x in mu])
+        Rout = MultiexpPrecomputed([hash_to_point(P[0]), W_I], [sk, ck])
+        return (Lout, Rout)
+
+    #Pin is an n x m array (as for MLSAG.Sign), column index is replaced by the keys of xk
+    def Sign(m, msgHash, xk, index, Pin, random):
+        assert(len(xk) == m)
+        assert( (len(Pin) % m ) == 0)
+        n = (len(Pin) // m)
+        assert( len(random) == n )
+        index = index % n
+
+        #Public keys and key images of the private keys
+        xk = SigningContexts(xk)
+        Pout = list(Pin)
+        for i in range(0, m):
+            Pout[m*index+i] = xk[i].P
+
+        I = [xk[0].I] + [multiply(xk[0].Hp, xk[i].xk) for i in range(1, m)]
+        batch_normalize(Pout + I)
+
+        #Aggregate rows
+        (mu, prefix) = CLSAG.RingHash(msgHash, Pout, I)
+        W_I = multiexp(I, mu)
+        w = 0
+        for i in range(0, m):
+            w = (w + mu[i] * xk[i].xk) % Ncurve
+
+        #Start ring, then go around it back to the signer
+        signature = [0]*(n+1)
+        (left, right) = xk[0].StartRing(random[index])
+        ck = CLSAG.RingHashFunction(prefix, left, right)
+        for k in range(1, n):
+            j = (index + k) % n
+            if (j == 0):
+                signature[0] = ck
+
+            (left, right) = CLSAG.CalculateRingSegment_NoHash(ck, random[j], Pout[m*j:m*j+m], mu, W_I)
+            ck = CLSAG.RingHashFunction(prefix, left, right)
+
+            #Store s value
+            signature[j+1] = random[j]
+
+        if (index == 0):
+            signature[0] = ck
+
+        #Close Ring
+        signature[index+1] = MLSAG.CompleteRing(random[index], ck, w)
+
+        return CLSAG(msgHash, I, Pout, signature)
+
+    def Sign_GenRandom(m, msgHash, xk, index, Pin):
+        assert(len(xk) == m)
+        assert( (len(Pin) % m ) == 0)
+        n = (len(Pin) // m)
+
+        #Create random numbers, starting the ring from a precomputed nonce where available
+        random = getRandomVector(n)
+        xk = SigningContexts(xk)
+        alpha = xk[0].NextNonce()
+        if (alpha != None):
+            random[index % n] = alpha
+
+        return CLSAG.Sign(m, msgHash, xk, index, Pin, random)
+
+    def Verify(self):
+        #Check input parameter lengths
+        m = len(self.key_images)
+        if (m == 0): return False
+        if (len(self.pub_keys) % m != 0): return False
+        n = len(self.pub_keys) // m
+        if (n == 0): return False
+        if (len(self.signature) != (n+1)): return False
+
+        #The point at infinity is never a valid key or key image (it would drop its row from the ring)
+        for i in range(0, len(self.pub_keys)):
+            if (self.pub_keys.Compressed(i) == 0): return False
+
+        for i in range(0, m):
+            if (self.key_images.Compressed(i) == 0): return False
+
+        #Decode the keys and scalars once
+        (pub_keys, key_images, signature) = (list(self.pub_keys), list(self.key_images), list(self.signature))
+
+        #Aggregate rows
+        batch_normalize(pub_keys + key_images)
+        (mu, prefix) = CLSAG.RingHash(self.msgHash, pub_keys, key_images)
+        W_I = multiexp(key_images, mu)
+
+        #Calculate Ring
+        ck = signature[0]
+        for j in range(0, n):
+            (left, right) = CLSAG.CalculateRingSegment_NoHash(ck, signature[j+1], pub_keys[m*j:m*j+m], mu, W_I)
+            ck = CLSAG.RingHashFunction(prefix, left, right)
+
+        #Check if ring is closed
+        return (signature[0] == ck)
+
+    #Flat list of 256-bit words: m, n, public keys (x, y), key images (x, y), c1, s1, ..., sn
+    def Serialize(self):
+        m = len(self.key_images)
+        n = len(self.pub_keys) // m
+        out = [m, n]
+
+        for point in batch_normalize(self.pub_keys + self.key_images):
+            out += [int(point[0].n), int(point[1].n)]
+
+        return tuple(out + list(self.signature))
+
+    def Print(self):
+        print("CLSAG Signature:")
+        print("Dimensions: " + str(len(self.key_images)) + " x " + str(len(self.pub_keys)//len(self.key_images)))
+        print("Message Hash: ")
+        print(hex(bytes_to_int(self.msgHash)))
+
+        print("Key Images:")
+        for i in range(0, len(self.key_images)):
+            print(hex(CompressPoint(self.key_images[i])))
+
+        print("Pub Keys:")
+        for i in range(0, len(self.pub_keys)):
+            print(hex(CompressPoint(self.pub_keys[i])))
+
+        print("Signature:")
+        for i in range(0, len(self.signature)):
+            print(hex(self.signature[i]))
+
 def MSAG_Test(m=4, n=3):
     import random
-    xk = []
     indices = []
-    pub_keys = []
 
     #Generate Private Keys
+    xk = getRandomVector(m)
     for i in range(0, m):
-        xk = xk + [getRandom()]
         indices = indices + [random.randrange(0, n)]
 
     #Generate Mix-in Public Keys
-    for i in range(0, m*(n-1)):
-        P = multiply(G1, getRandom())
-        pub_keys = pub_keys + [P]
+    pub_keys = [MultiplyG1(x) for x in getRandomVector(m*(n-1))]
 
     msg = b"MSAGTest"
     hasher = sha3.keccak_256()
@@ -668,19 +1306,15 @@ def MSAG_Test(m=4, n=3):
 
 def MLSAG_Test(m=4, n=3):
     import random
-    xk = []
     indices = []
-    pub_keys = []
 
     #Generate Private Keys
+    xk = getRandomVector(m)
     for i in range(0, m):
-        xk = xk + [getRandom()]
         indices = indices + [random.randrange(0, n)]
 
     #Generate Mix-in Public Keys
-    for i in range(0, m*(n-1)):
-        P = multiply(G1, getRandom())
-        pub_keys = pub_keys + [P]
+    pub_keys = [MultiplyG1(x) for x in getRandomVector(m*(n-1))]
 
     msg = b"MLSAGTest"
     hasher = sha3.keccak_256()
@@ -701,3 +1335,24 @@ def MLSAG_Test(m=4, n=3):
         
         
         
+
+def CLSAG_Test(m=2, n=4):
+    import random
+
+    #Generate Private Keys and Mix-in Public Keys
+    xk = getRandomVector(m)
+    index = random.randrange(0, n)
+    pub_keys = [MultiplyG1(x) for x in getRandomVector(m*n)]
+
+    msg = b"CLSAGTest"
+    hasher = sha3.keccak_256()
+    hasher.update(msg)
+    msgHash = int_to_bytes32(bytes_to_int(hasher.digest()))
+
+    clsag_signature = CLSAG.Sign_GenRandom(m, msgHash, xk, index, pub_keys)
+    clsag_signature.Print()
+
+    if (clsag_signature.Verify()):
+        print("CLSAG Verification Success!")
+    else:
+        print("CLSAG Verification Failure!")
@@ -14,28 +14,33 @@ def print_pub_keys(x, m, a, n):
         print("--")
 
 class RingCT:
-    ring_size = 0
-    input_count = 0
-    input_commitments = []
-    output_transactions = []
-    mlsag = 0
-    redeem_eth_address = 0
-    redeem_eth_value = 0
+    #CLSAG mode (mlsag = 0): one CLSAG per input and the inputs' pseudo commitments
+    __slots__ = ("ring_size", "input_count", "input_commitments", "output_transactions", "mlsag",
+                 "redeem_eth_address", "redeem_eth_value", "clsag", "pseudo_commitments")
     
     def __init__(self, ring_size, input_count, input_commitments,
                  output_transactions, mlsag,
-                 redeem_eth_address=0, redeem_eth_value=0):
+                 redeem_eth_address=0, redeem_eth_value=0,
+                 clsag=None, pseudo_commitments=None):
         self.ring_size = ring_size
         self.input_count = input_count
-        self.input_commitments = input_commitments
+        self.input_commitments = PointVector(input_commitments)
         self.output_transactions = output_transactions
         self.mlsag = mlsag
         self.redeem_eth_address = redeem_eth_address
         self.redeem_eth_value = redeem_eth_value
+        self.clsag = clsag if clsag != None else []
+        self.pseudo_commitments = PointVector(pseudo_commitments if pseudo_commitments != None else [])
 
+    def IsCLSAG(self):
+        return (self.mlsag == 0)
+
+    #xk may hold private keys or SigningContext objects (with the input's public key and commitment)
+    #executor (optional) computes the MLSAG rows in parallel, see ring_signatures.parallelRingThreshold
+    #useCLSAG signs each input with a CLSAG instead of signing all of them with one MLSAG
     def Sign(xk, xk_v, xk_bf, mixin_transactions,
              output_transactions, out_v, out_bf,
-             redeem_eth_address=0, redeem_eth_value=0):
+             redeem_eth_address=0, redeem_eth_value=0, executor=None, useCLSAG=False):
         import random
 
         #Check array dimensions
@@ -82,6 +87,12 @@ class RingCT:
         assert(in_value == out_value)
         assert(z != 0) #blinding factors must add to a non-zero otherwise privacy is erased!
 
+        #Derive public keys, key images and commitments of the inputs (once)
+        xk = SigningContexts(xk)
+        for i in range(0, input_count):
+            if (xk[i].commitment == None):
+                xk[i].commitment = CommitG1H(xk_bf[i], xk_v[i])
+
         #Pick slot for key vector
         indices = [random.randrange(0, n)] * m
         pub_keys = [NullPoint] * (m*n)
@@ -94,8 +105,8 @@ class RingCT:
             
             for j in range(0, n):
                 if (j == indices[0]):
-                    pub_keys[j*m+i] = multiply(G1, xk[i])
-                    input_commitments_new[j*(m-1)+i] = add(multiply(H, xk_v[i]), multiply(G1, xk_bf[i]))
+                    pub_keys[j*m+i] = xk[i].P
+                    input_commitments_new[j*(m-1)+i] = xk[i].commitment
                 elif(j > indices[0]):
                     pub_keys[j*m+i] = mixin_transactions[(j-1)*(m-1)+i].pub_key
                     input_commitments_new[j*(m-1)+i] = mixin_transactions[(j-1)*(m-1)+i].c_value
@@ -105,6 +116,11 @@ class RingCT:
 
         #Start building signature massage over output public keys, committed values, dhe points, and encrypted messages (both message and iv)
         #Hash output transactions
+        points = []
+        for i in range(0, output_count):
+            points += [output_transactions[i].pub_key, output_transactions[i].c_value, output_transactions[i].dhe_point]
+        batch_normalize(points)
+
         msgHash = int_to_bytes32(output_count)
 
         for i in range(0, output_count):
@@ -114,7 +130,7 @@ class RingCT:
             #Hash pub keys, values, dhe points, and encrypted data
             hasher = add_point_to_hasher(hasher, output_transactions[i].pub_key)
 
-            assert(eq(add(multiply(H, out_v[i]), multiply(G1, out_bf[i])), output_transactions[i].c_value))
+            assert(eq(CommitG1H(out_bf[i], out_v[i]), output_transactions[i].c_value))
             hasher = add_point_to_hasher(hasher, output_transactions[i].c_value)
 
             hasher = add_point_to_hasher(hasher, output_transactions[i].dhe_point)
@@ -136,8 +152,28 @@ class RingCT:
 
             #Compute new digest
             msgHash = hasher.digest()
+
+        #CLSAG mode: input i is signed over the ring of (public key, commitment - pseudo commitment i)
+        #The pseudo commitments commit to the input values again, their blinding factors add up to the outputs'
+        if (useCLSAG):
+            pseudo_bf = getRandomVector(m-2)
+            pseudo_bf.append((total_out_bf + Ncurve - (sum(pseudo_bf) % Ncurve)) % Ncurve)
+            pseudo_commitments = [CommitG1H(pseudo_bf[i], xk_v[i]) for i in range(0, m-1)]
+
+            clsag = []
+            for i in range(0, m-1):
+                neg_pseudo_commitment = neg(pseudo_commitments[i])
+                ring = []
+                for j in range(0, n):
+                    ring += [pub_keys[j*m+i], add(input_commitments_new[j*(m-1)+i], neg_pseudo_commitment)]
+
+                z = SigningContext((xk_bf[i] + Ncurve - pseudo_bf[i]) % Ncurve, P=ring[2*indices[0]+1])
+                clsag.append(CLSAG.Sign_GenRandom(2, msgHash, [xk[i], z], indices[0], ring))
+
+            return RingCT(n, m-1, input_commitments_new, output_transactions, 0,
+                          redeem_eth_address, redeem_eth_value, clsag, pseudo_commitments)
         
-        neg_total_out_commitment = neg(add(multiply(H, in_value), multiply(G1, total_out_bf)))
+        neg_total_out_commitment = neg(CommitG1H(total_out_bf, in_value))
         
         #Sum up last column
         for j in range(0, n):
@@ -151,18 +187,21 @@ class RingCT:
             #Store last column of public keys
             pub_keys[j*m+(m-1)] = s_point                
 
-        #Determine private key for last column
+        #Determine private key for last column, its public key is the sum in the signer's column
         priv_keys[m-1] = z
         for i in range(0, m-1):
-            priv_keys[m-1] = (priv_keys[m-1] + xk[i]) % Ncurve
+            priv_keys[m-1] = (priv_keys[m-1] + xk[i].xk) % Ncurve
+
+        priv_keys[m-1] = SigningContext(priv_keys[m-1], P=pub_keys[indices[0]*m+(m-1)])
 
         return( RingCT(n, m-1,
                        input_commitments_new,
                        output_transactions,
-                       MLSAG.Sign_GenRandom(m, msgHash, priv_keys, indices, pub_keys),
+                       MLSAG.Sign_GenRandom(m, msgHash, priv_keys, indices, pub_keys, executor),
                        redeem_eth_address, redeem_eth_value))
 
-    def Verify(self):
+    #executor (optional) computes the MLSAG rows in parallel, see ring_signatures.parallelRingThreshold
+    def Verify(self, executor=None):
         #Assert array lengths
         if(self.input_count <= 0): return False
         output_count = len(self.output_transactions)
@@ -180,23 +219,49 @@ class RingCT:
 
         #Add redeem commitment for withdrawal
         if (self.redeem_eth_value > 0):
-            neg_total_output_commitment  = add(neg_total_output_commitment, multiply(H, self.redeem_eth_value))
+            neg_total_output_commitment  = add(neg_total_output_commitment, MultiplyH(self.redeem_eth_value))
 
         #negate it
         neg_total_output_commitment = neg(neg_total_output_commitment)
 
         #Verify that signature was built right
-        for j in range(0, n):
+        if (self.IsCLSAG()):
+            #Pseudo commitments must add up to the outputs, each ring must be (public key, commitment - pseudo commitment)
+            if (len(self.clsag) != m-1 or len(self.pseudo_commitments) != m-1): return False
+            for i in range(0, m-1):
+                if (self.pseudo_commitments.Compressed(i) == 0): return False
+
             s_point = neg_total_output_commitment
-            
             for i in range(0, m-1):
-                s_point = add(s_point, self.mlsag.pub_keys[j*m+i])
-                s_point = add(s_point, self.input_commitments[j*(m-1)+i])
+                s_point = add(s_point, self.pseudo_commitments[i])
+
+            if (not is_inf(s_point)): return False
 
-            if (not eq(s_point, self.mlsag.pub_keys[j*m+(m-1)])): return False
+            for i in range(0, m-1):
+                if (len(self.clsag[i].key_images) != 2 or len(self.clsag[i].pub_keys) != 2*n): return False
+
+                #Compare compressed encodings of the recomputed commitment row (not eq() on supplied points)
+                neg_pseudo_commitment = neg(self.pseudo_commitments[i])
+                for j in range(0, n):
+                    key = CompressPoint(add(self.input_commitments[j*(m-1)+i], neg_pseudo_commitment))
+                    if (key == 0 or key != self.clsag[i].pub_keys.Compressed(2*j+1)): return False
+        else:
+            for j in range(0, n):
+                s_point = neg_total_output_commitment
+                
+                for i in range(0, m-1):
+                    s_point = add(s_point, self.mlsag.pub_keys[j*m+i])
+                    s_point = add(s_point, self.input_commitments[j*(m-1)+i])
+
+                if (not eq(s_point, self.mlsag.pub_keys[j*m+(m-1)])): return False
 
         #Verify hash of output transactions: public keys, committed values, dhe_points, and encrypted data (message and iv)
         #Hash output transactions
+        points = []
+        for i in range(0, output_count):
+            points += [self.output_transactions[i].pub_key, self.output_transactions[i].c_value, self.output_transactions[i].dhe_point]
+        batch_normalize(points)
+
         msgHash = int_to_bytes32(output_count)
 
         for i in range(0, output_count):
@@ -227,12 +292,25 @@ class RingCT:
             msgHash = hasher.digest()
 
         msgHash = hasher.digest()        
+        if (self.IsCLSAG()):
+            for sig in self.clsag:
+                if (msgHash != sig.msgHash): return False
+
+            #Verify signatures
+            for sig in self.clsag:
+                if (not sig.Verify()): return False
+
+            return True
+
         if (msgHash != self.mlsag.msgHash): return False
 
         #Verify signature
-        return self.mlsag.Verify()
+        return self.mlsag.Verify(executor)
 
     def Serialize(self):
+        if (self.IsCLSAG()):
+            return self.Serialize_CLSAG()
+
         out = [self.redeem_eth_address, self.redeem_eth_value]
 
         m = len(self.mlsag.key_images)
@@ -241,22 +319,31 @@ class RingCT:
 
         out += [n*(m-1), len(self.output_transactions), len(self.mlsag.key_images)*2, len(self.mlsag.signature)]
 
+        #Normalize every point with a single inversion
+        points = []
+        for j in range(0, n):
+            for i in range(0, m-1):
+                points += [self.mlsag.pub_keys[j*m+i]]
+
+        for i in range(0, len(self.output_transactions)):
+            points += [self.output_transactions[i].pub_key, self.output_transactions[i].c_value, self.output_transactions[i].dhe_point]
+
+        points += self.mlsag.key_images[:m]
+        points = batch_normalize(points)
+        k = 0
+
         #Print input utxos (public key only, committed values will be supplied by the contract)
         for j in range(0, n):
             for i in range(0, m-1):
-                point = normalize(self.mlsag.pub_keys[j*m+i])
+                point = points[k]
+                k += 1
                 out += [point[0], point[1]]
         
         #Print output utxos (public key, dhe_point, committed value, and encrypted data)
         for i in range(0, len(self.output_transactions)):
-            point = normalize(self.output_transactions[i].pub_key)
-            out += [point[0], point[1]]
-
-            point = normalize(self.output_transactions[i].c_value)
-            out += [point[0], point[1]]
-
-            point = normalize(self.output_transactions[i].dhe_point)
-            out += [point[0], point[1]]
+            for point in points[k:k+3]:
+                out += [point[0], point[1]]
+            k += 3
 
             out += [bytes_to_int(self.output_transactions[i].pc_encrypted_data.message[:32]),
                     bytes_to_int(self.output_transactions[i].pc_encrypted_data.message[32:]),
@@ -264,7 +351,7 @@ class RingCT:
 
         #Print key images
         for i in range(0, m):
-            point = normalize(self.mlsag.key_images[i])
+            point = points[k+i]
             out += [point[0], point[1]]
 
         #Print signature (c1, s1, s2, ... snm)
@@ -273,7 +360,60 @@ class RingCT:
 
         return tuple(out)
 
+    #CLSAG mode: input public keys, outputs, pseudo commitments, then the key images (I, D) and
+    #signature (c1, s1, ... sn) of each input
+    def Serialize_CLSAG(self):
+        out = [self.redeem_eth_address, self.redeem_eth_value]
+
+        n = self.ring_size
+        k = self.input_count
+        out += [n*k, len(self.output_transactions), 4*k, k*(n+1)]
+
+        #Normalize every point with a single inversion
+        points = []
+        for j in range(0, n):
+            for i in range(0, k):
+                points += [self.clsag[i].pub_keys[2*j]]
+
+        for i in range(0, len(self.output_transactions)):
+            points += [self.output_transactions[i].pub_key, self.output_transactions[i].c_value, self.output_transactions[i].dhe_point]
+
+        points += self.pseudo_commitments
+        for i in range(0, k):
+            points += self.clsag[i].key_images
+
+        points = batch_normalize(points)
+
+        #Print input utxos (public key only, committed values will be supplied by the contract)
+        for point in points[:n*k]:
+            out += [point[0], point[1]]
+        k2 = n*k
+
+        #Print output utxos (public key, dhe_point, committed value, and encrypted data)
+        for i in range(0, len(self.output_transactions)):
+            for point in points[k2:k2+3]:
+                out += [point[0], point[1]]
+            k2 += 3
+
+            out += [bytes_to_int(self.output_transactions[i].pc_encrypted_data.message[:32]),
+                    bytes_to_int(self.output_transactions[i].pc_encrypted_data.message[32:]),
+                    bytes_to_int(self.output_transactions[i].pc_encrypted_data.iv)]
+
+        #Print pseudo commitments and key images
+        for point in points[k2:]:
+            out += [point[0], point[1]]
+
+        #Print signatures
+        for i in range(0, k):
+            out += self.clsag[i].signature
+
+        return tuple(out)
+
     def Print(self):
+        if (self.IsCLSAG()):
+            self.Print_CLSAG()
+            return
+
         print("Ring CT Transaction")
         print("Inputs (PubKey1, C_Value1), ..., (PubKeyM, C_ValueM), {sum(PubKey1...M-1) + sum(C_Value1...M-1) - sum(C_Value_Out)}:")
         
@@ -299,7 +439,35 @@ class RingCT:
             print("Redeemed ETH Address: " + hex(self.redeem_eth_address))
             print("Redeemed ETH Value: " + str(self.redeem_eth_value) + " wei or " + str(self.redeem_eth_value / 10**18) + " ETH")
 
+    def Print_CLSAG(self):
+        print("Ring CT Transaction (CLSAG)")
+        print("Inputs (PubKey1, C_Value1), ..., (PubKeyM, C_ValueM):")
+
+        for j in range(0, self.ring_size):
+            print("Key Vector " + str(j+1))
+
+            for i in range(0, self.input_count):
+                print(bytes_to_str(CompressPoint(self.clsag[i].pub_keys[2*j])) + ", " + bytes_to_str(CompressPoint(self.input_commitments[j*(self.input_count) + i])))
+
+        print("-----")
+        print("Pseudo Commitments")
+        for i in range(0, self.input_count):
+            print(bytes_to_str(CompressPoint(self.pseudo_commitments[i])))
+
+        print("-----")
+        print("Outputs (PubKeyK, C_Value_OutK)")
+        for i in range(0, len(self.output_transactions)):
+            print("Output " + str(i+1))
+            print(bytes_to_str(CompressPoint(self.output_transactions[i].pub_key)) + ", " + bytes_to_str(CompressPoint(self.output_transactions[i].c_value)))
+
+        if (self.redeem_eth_value > 0):
+            print("-----")
+            print("Redeemed ETH Address: " + hex(self.redeem_eth_address))
+            print("Redeemed ETH Value: " + str(self.redeem_eth_value) + " wei or " + str(self.redeem_eth_value / 10**18) + " ETH")
+
+    #MLSAG mode only (the contract verifies MLSAG signatures)
     def Print_MEW(self):
+        assert(not self.IsCLSAG())
         output_count = len(self.output_transactions)
 
         print("Ring CT MEW Representation - for use with Send():")
@@ -346,7 +514,7 @@ class RingCT:
 
         print()
 
-def RingCTTest(input_count = 2, mixin_count = 3, outputs = 2, rngSeed=0):
+def RingCTTest(input_count = 2, mixin_count = 3, outputs = 2, rngSeed=0, useCLSAG=False):
     import random
     print()
     print("================================")
@@ -359,8 +527,8 @@ def RingCTTest(input_count = 2, mixin_count = 3, outputs = 2, rngSeed=0):
     #Store View and Spend Keys
     pri_viewkey  = 0x26748d27140087af35b5523fbf4063a48e10277b7bb67379eae64b1e9bcdd49c
     pri_spendkey = 0x0657e10b4ecf56e94546357f35447ec39f6fee66c44c013aa55b54fcd6e4c340
-    pub_viewkey  = multiply(G1, pri_viewkey)
-    pub_spendkey = multiply(G1, pri_spendkey)
+    pub_viewkey  = MultiplyG1(pri_viewkey)
+    pub_spendkey = MultiplyG1(pri_spendkey)
 
     #Pre-fetch random values for repeatable results
     r_index = 0
@@ -497,7 +665,38 @@ def RingCTTest(input_count = 2, mixin_count = 3, outputs = 2, rngSeed=0):
 
     print("================================")
     print("RingCT Send (MEW):")
-    rct = RingCT.Sign(rct_xk, rct_xk_v, rct_xk_bf, rct_mixin_tx, stealth_tx_out, stealth_tx_out_v, stealth_tx_out_bf)
-    rct.Print_MEW()
+    rct = RingCT.Sign(rct_xk, rct_xk_v, rct_xk_bf, rct_mixin_tx, stealth_tx_out, stealth_tx_out_v, stealth_tx_out_bf, useCLSAG=useCLSAG)
+    if (useCLSAG):
+        rct.Print()
+    else:
+        rct.Print_MEW()
 
     return rct
+
+#Negative test: a CLSAG ring whose commitment row is the point at infinity must not let an input of
+#1 wei pay an output of 10**24 wei (the pseudo commitment is simply set to the output commitment)
+def RingCT_CLSAGForgeryTest():
+    from codec import Encode, Decode
+
+    pub_viewkey = MultiplyG1(getRandom())
+    pub_spendkey = MultiplyG1(getRandom())
+    (x, bf_in, bf_out) = getRandomVector(3)
+    utxo = SigningContext(x, commitment=CommitG1H(bf_in, 1))
+    decoy = StealthTransaction.Generate_GenRandom(pub_viewkey, pub_spendkey, 1, getRandom())
+    output = StealthTransaction.Generate_GenRandom(pub_viewkey, pub_spendkey, 10**24, bf_out)
+
+    #Message hash of the output, taken from an honest signature of an input worth 10**24
+    honest = RingCT.Sign([getRandom()], [10**24], [getRandom()], [decoy], output, 10**24, bf_out, useCLSAG=True)
+    msgHash = honest.clsag[0].msgHash
+
+    ring = [utxo.P, NullPoint, decoy.pub_key, NullPoint]
+    clsag = CLSAG.Sign_GenRandom(2, msgHash, [x, 0], 0, ring)
+    forged = RingCT(2, 1, [utxo.commitment, decoy.c_value], [output], 0, 0, 0, [clsag], [output.c_value])
+
+    passed = honest.Verify() and not forged.Verify() and not Decode(Encode(forged)).Verify()
+    if (passed):
+        print("RingCT CLSAG Forgery Test passed!")
+    else:
+        print("RingCT CLSAG Forgery Test failed!")
+
+    return passed
@@ -1,33 +1,35 @@
 from ct import *
 
 class StealthTransaction:
-    pub_key = 0
-    dhe_point = 0
-    c_value = 0
-    pc_encrypted_data = 0
+    __slots__ = ("pub_key", "dhe_point", "c_value", "pc_encrypted_data")
     
-    def __init__(self, pub_key=0, dhe_point=0, c_value=0, pc_encrypted_data=0):
+    #Points are kept compressed (see CompactPoint), compact=False keeps them as given instead
+    #(e.g. points already expanded in bulk with ExpandPoints(), which would otherwise be expanded again)
+    def __init__(self, pub_key=0, dhe_point=0, c_value=0, pc_encrypted_data=0, compact=True):
+        if (compact):
+            (pub_key, dhe_point, c_value) = (CompactPoint(pub_key), CompactPoint(dhe_point), CompactPoint(c_value))
+
         self.pub_key = pub_key
         self.dhe_point = dhe_point
         self.pc_encrypted_data = pc_encrypted_data
         self.c_value = c_value
 
     def isEncrypted(self):
-        if (type(self.c_value) == tuple):
+        if (is_point(self.c_value)):
             return True
         else:
             return False
 
     def Generate(pubViewKey, pubSpendKey, value, blinding_factor, r):
-        R = multiply(G1, r)
+        R = MultiplyG1(r)
 
         ss1 = hash_of_point(multiply(pubViewKey, r)) % Ncurve
-        dest_pub_key = add(multiply(G1, ss1), pubSpendKey)
+        dest_pub_key = add(MultiplyG1(ss1), pubSpendKey)
 
         ss2 = hash_of_point(multiply(pubSpendKey, r))
         encrypted_message = PCAESMessage.Encrypt(value, blinding_factor, ss2)
 
-        c_value = add(multiply(H, value), multiply(G1, blinding_factor))
+        c_value = CommitG1H(blinding_factor, value)
 
         return StealthTransaction(dest_pub_key, R, c_value, encrypted_message)
 
@@ -38,7 +40,7 @@ class StealthTransaction:
 
     def CheckOwnership(self, privViewKey, pubSpendKey):
         ss = hash_of_point(multiply(self.dhe_point, privViewKey)) % Ncurve
-        pub_key = add(multiply(G1, ss), pubSpendKey)
+        pub_key = add(MultiplyG1(ss), pubSpendKey)
 
         if (eq(self.pub_key, pub_key)):
             return True
@@ -60,13 +62,13 @@ class StealthTransaction:
 
     def Print(self):
         #print("Stealth Transaction:")
-        if (type(self.pub_key) == tuple):
+        if (is_point(self.pub_key)):
             print("Public Key: " + bytes32_to_str(CompressPoint(self.pub_key)))
 
-        if (type(self.dhe_point) == tuple):
+        if (is_point(self.dhe_point)):
             print("DHE Point: " + bytes32_to_str(CompressPoint(self.dhe_point)))
 
-        if (type(self.c_value) == tuple):
+        if (is_point(self.c_value)):
             print("C_Value: " + bytes32_to_str(CompressPoint(self.c_value)))
         elif (type(self.c_value) == int):
             print("Value: " + str(self.c_value))
@@ -82,10 +84,10 @@ class StealthTransaction:
     
 def StealthTxTest():
     MyPrivateViewKey = getRandom()
-    MyPublicViewKey = multiply(G1, MyPrivateViewKey)
+    MyPublicViewKey = MultiplyG1(MyPrivateViewKey)
     
     MyPrivateSpendKey = getRandom()
-    MyPublicSpendKey = multiply(G1, MyPrivateSpendKey)
+    MyPublicSpendKey = MultiplyG1(MyPrivateSpendKey)
     print("Generating Stealth Address: ")
     print("Public View Key: " + print_point(CompressPoint(MyPublicViewKey)))
     print("Public Spend Key: " + print_point(CompressPoint(MyPublicSpendKey)))
@@ -1,16 +1,22 @@
 #from bn128_curve import *
 from optimized_curve import *
+from bigint import powmod
+import curve_kernel as _kernel
 import sha3
+from collections import OrderedDict
+import threading
+from csprng import ScalarStream
 
 #alt_bn_128 curve parameters
 Ncurve = curve_order
 Pcurve = field_modulus
 ECSignMask = 0x8000000000000000000000000000000000000000000000000000000000000000
-NullPoint = (FQ(0), FQ(0), FQ(0))
+NullPoint = G1Point(FQ(0), FQ(0), FQ(0))
 counters = [0]*32
 
 useShamir = True    #Flag True to use Shamir's Trick to compute (a*A + b*B) effectively
 useWindowed = True  #Flag True to use windowed EC Multiplication
+useGLV = True       #Flag True to split windowed multiplications with the GLV endomorphism (BN254 G1)
 
 def bytes_to_int(bytes):
     result = 0
@@ -68,7 +74,7 @@ def int_to_bytes16(i):
     return x
 
 def to_point(x, y):
-    return (FQ(x), FQ(y), FQ(1))
+    return G1Point(FQ(x), FQ(y), FQ(1))
 
 def bytes_to_str(b, N=32):
     s = hex(b)
@@ -80,13 +86,17 @@ def bytes_to_str(b, N=32):
 
     return s
 
+#True for points (G1Point or (FQ, FQ, FQ) tuples), False for compressed points (int)
+def is_point(p):
+    return isinstance(p, (tuple, G1Point))
+
 def point_to_str(p):
-    if (type(p) != tuple):
+    if (not is_point(p)):
         p = ExpandPoint(p)
 
-    p = normalize(p)
+    (x, y) = to_g1point(p).affine()
     
-    s = (bytes_to_str(p[0].n) + ",\n" + bytes_to_str(p[1].n))
+    s = (bytes_to_str(x) + ",\n" + bytes_to_str(y))
     return s
 
 def hash_of_int(i):
@@ -95,88 +105,437 @@ def hash_of_int(i):
     return x
 
 def hash_of_point(p):
-    p = normalize(p)
+    (x, y) = to_g1point(p).affine()
     hasher = sha3.keccak_256()
-    hasher.update(int_to_bytes32(p[0].n))
-    hasher.update(int_to_bytes32(p[1].n))
+    hasher.update(int_to_bytes32(x))
+    hasher.update(int_to_bytes32(y))
     x = bytes_to_int(hasher.digest())
     return x
 
+#Returns (CompressPoint(P), affine P as a kernel point), cached on G1Point objects
+def PointKey(P):
+    P = to_g1point(P)
+    (x, y) = P.affine()
+    return (P.compressed(), (x, y, 1))
+
+#hash_to_point() Cache
+#Hp(P) is memoized keyed by the compressed encoding of P, so ring members shared between
+#signatures (decoys) are only hashed once.  At most hashToPointCacheSize results are kept,
+#least recently used first out.  The cache may be used from several threads.
+hashToPointCacheSize = 4096
+_hash_to_point_cache = OrderedDict()
+_hash_to_point_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_hash_to_point_lock = threading.Lock()
+
 def hash_to_point(p):
-    p = normalize(p)
+    if (p[2] == 0):
+        #normalize() maps the point at infinity to (0, 0)
+        return hash_to_point_affine(0, 0)
+
+    (key, (x, y, z)) = PointKey(p)
+    with _hash_to_point_lock:
+        out = _hash_to_point_cache.get(key)
+        if (out != None):
+            _hash_to_point_stats["hits"] += 1
+            _hash_to_point_cache.move_to_end(key)
+            return out
+
+        _hash_to_point_stats["misses"] += 1
+
+    out = hash_to_point_affine(x, y)
+
+    with _hash_to_point_lock:
+        if (hashToPointCacheSize > 0):
+            _hash_to_point_cache[key] = out
+            while (len(_hash_to_point_cache) > hashToPointCacheSize):
+                _hash_to_point_cache.popitem(last=False)
+                _hash_to_point_stats["evictions"] += 1
+
+    return out
+
+def HashToPointStats():
+    with _hash_to_point_lock:
+        stats = dict(_hash_to_point_stats)
+        stats["size"] = len(_hash_to_point_cache)
+
+    return stats
+
+#Changes the cache size, evicting the oldest entries if it shrinks
+def SetHashToPointCacheSize(size):
+    global hashToPointCacheSize
+    with _hash_to_point_lock:
+        hashToPointCacheSize = size
+        while (len(_hash_to_point_cache) > max(size, 0)):
+            _hash_to_point_cache.popitem(last=False)
+            _hash_to_point_stats["evictions"] += 1
+
+def ClearHashToPointCache():
+    with _hash_to_point_lock:
+        _hash_to_point_cache.clear()
+        for k in _hash_to_point_stats:
+            _hash_to_point_stats[k] = 0
+
+#Uncached hash_to_point() of the affine point (x, y)
+def hash_to_point_affine(x, y):
     hasher = sha3.keccak_256()
-    hasher.update(int_to_bytes32(p[0].n))
-    hasher.update(int_to_bytes32(p[1].n))
+    hasher.update(int_to_bytes32(x))
+    hasher.update(int_to_bytes32(y))
     x = bytes_to_int(hasher.digest()) % Pcurve
 
     onCurve = False
     while(not onCurve):
         y_squared = (pow(x, 3, Pcurve) + 3) % Pcurve
-        y = pow(y_squared, (Pcurve+1)//4, Pcurve)
+        y = powmod(y_squared, (Pcurve+1)//4, Pcurve)
 
         onCurve = (pow(y,2,Pcurve) == y_squared)
 
         if(not(onCurve)):
             x = x + 1
 
-    return (FQ(x), FQ(y), FQ(1))
+    return G1Point(FQ(x), FQ(y), FQ(1))
 
 def add_point_to_hasher(hasher, point):
-    point = normalize(point)
-    hasher.update(int_to_bytes32(point[0].n))
-    hasher.update(int_to_bytes32(point[1].n))
+    (x, y) = to_g1point(point).affine()
+    hasher.update(int_to_bytes32(x))
+    hasher.update(int_to_bytes32(y))
     return hasher
 
-#Definition of H = hash_to_point(G1)
-H = hash_to_point(G1)
+#Definition of H = hash_to_point(G1), hardcoded so importing util does not hash (see H_SelfTest())
+H = G1Point(FQ(0x277a420332215ead37ba61fee84f0d216a345e762af8efd15453697170b3cdc5),
+            FQ(0x1b312cd37d4ad474fc299c9689fc0f347a2ec2b5b474a41b343142ee5fdd097a),
+            FQ(1))
+
+def H_SelfTest():
+    return eq(H, hash_to_point(G1))
+
+#eq() with the point at infinity: only equal to itself
+def InfinityEq_SelfTest():
+    inf = add(G1, neg(G1))
+    return (eq(inf, NullPoint) and eq(NullPoint, inf) and eq(inf, inf)
+            and not eq(inf, G1) and not eq(G1, inf) and not eq(NullPoint, H) and not eq(H, NullPoint))
 
 def KeyImage(xk):
-    return multiply(hash_to_point(multiply(G1,xk)), xk)
+    return multiply(hash_to_point(MultiplyG1(xk)), xk)
 
 #Utility Functions
+#Point Compression Cache
+#Expanded points are kept keyed by their compressed encoding (and points that get compressed are
+#added as well), so ExpandPoint() skips its modular sqrt for points already seen in either direction.
+#At most pointCacheSize points are kept, least recently used first out.
+pointCacheSize = 16384
+expandPointsPoolThreshold = 4096    #ExpandPoints() uses a process pool for at least this many new points
+_point_cache = OrderedDict()
+_point_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_point_cache_lock = threading.Lock()
+
+def _point_cache_get(Pin):
+    with _point_cache_lock:
+        P = _point_cache.get(Pin)
+        if (P != None):
+            _point_cache_stats["hits"] += 1
+            _point_cache.move_to_end(Pin)
+        else:
+            _point_cache_stats["misses"] += 1
+
+        return P
+
+def _point_cache_put(Pin, P):
+    with _point_cache_lock:
+        if (pointCacheSize > 0):
+            _point_cache[Pin] = P
+            _point_cache.move_to_end(Pin)
+            while (len(_point_cache) > pointCacheSize):
+                _point_cache.popitem(last=False)
+                _point_cache_stats["evictions"] += 1
+
+def PointCacheStats():
+    with _point_cache_lock:
+        stats = dict(_point_cache_stats)
+        stats["size"] = len(_point_cache)
+
+    return stats
+
+def ClearPointCache():
+    with _point_cache_lock:
+        _point_cache.clear()
+        for k in _point_cache_stats:
+            _point_cache_stats[k] = 0
+
 def CompressPoint(Pin):
-    if (type(Pin) != tuple):
+    if (not is_point(Pin)):
         return Pin
+
+    #Already compressed, do not expand it (0 for the point at infinity)
+    if (type(Pin) == LazyG1Point):
+        return Pin._compressed
     
-    Pin = normalize(Pin)
-    Pout = Pin[0].n
-    if ( (Pin[1].n & 0x1) == 0x1):
-        Pout = Pout | ECSignMask
+    Pin = to_g1point(Pin)
+    Pout = Pin.compressed()
+    if (Pin[2] != 0):
+        _point_cache_put(Pout, Pin)
 
     return Pout
 
-def ExpandPoint(Pin):
-    import math
-    
-    x = Pin & (~ECSignMask)
+#Affine (x, y) integers of a compressed point (uncached)
+#Raises ValueError if x**3 + 3 has no square root, i.e. no point with this x is on the curve
+def ExpandPointAffine(Pin):
+    x = (Pin & (~ECSignMask)) % Pcurve
     y_squared = (pow(x,3,Pcurve) + 3) % Pcurve
-    y = pow(y_squared, (Pcurve+1)//4, Pcurve)
+    y = int(powmod(y_squared, (Pcurve+1)//4, Pcurve))
+    if ((y * y - y_squared) % Pcurve != 0):
+        raise ValueError("compressed point " + hex(Pin) + " is not on the curve")
 
     if ((Pin & ECSignMask) == 0):
         if ( (y & 0x1) == 0 ):
-            Pout = (FQ(x), FQ(y), FQ(1))
+            return (x, y)
         else:
-            Pout = (FQ(x), FQ(Pcurve-y), FQ(1))
+            return (x, Pcurve-y)
     else:
         if ( (y & 0x1) == 0 ):
-            Pout = (FQ(x), FQ(Pcurve-y), FQ(1))
+            return (x, Pcurve-y)
         else:
-            Pout = (FQ(x), FQ(y), FQ(1))
+            return (x, y)
+
+def _expand_points_affine(Pin):
+    return [ExpandPointAffine(p) for p in Pin]
+
+def ExpandPoint(Pin):
+    Pout = _point_cache_get(Pin)
+    if (Pout == None):
+        (x, y) = ExpandPointAffine(Pin)
+        Pout = G1Point(FQ(x), FQ(y), FQ(1))
+        _point_cache_put(Pin, Pout)
 
     return Pout
 
-def getRandom(count=1):
-    import random
+#ExpandPoint() for a list of compressed points
+#Points not in the cache are expanded by a pool of worker processes when there are at least
+#expandPointsPoolThreshold of them (workers=1 keeps everything in this process)
+def ExpandPoints(Pin, workers=None):
+    Pout = [_point_cache_get(p) for p in Pin]
+    missing = [i for i in range(0, len(Pin)) if Pout[i] == None]
+
+    if (len(missing) >= expandPointsPoolThreshold and workers != 1):
+        import concurrent.futures
+        import os
+
+        if (workers == None):
+            workers = os.cpu_count() or 1
+
+        chunk = (len(missing) + workers - 1) // workers
+        chunks = [[Pin[i] for i in missing[j:j+chunk]] for j in range(0, len(missing), chunk)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            affine = []
+            for result in executor.map(_expand_points_affine, chunks):
+                affine += result
+    else:
+        affine = _expand_points_affine([Pin[i] for i in missing])
+
+    for k in range(0, len(missing)):
+        i = missing[k]
+        (x, y) = affine[k]
+        Pout[i] = G1Point(FQ(x), FQ(y), FQ(1))
+        _point_cache_put(Pin[i], Pout[i])
+
+    return Pout
+
+#G1Point decoded from its compressed encoding on first use
+class LazyG1Point(G1Point):
+    __slots__ = ()
+
+    def __init__(self, compressed):
+        self._compressed = compressed
+        self._affine = None
+
+    def _expand(self):
+        P = ExpandPoint(self._compressed)
+        G1Point.x.__set__(self, P.x)
+        G1Point.y.__set__(self, P.y)
+        G1Point.z.__set__(self, P.z)
+        self._affine = P.affine()
+
+    def _get(slot):
+        def get(self):
+            try:
+                return slot.__get__(self)
+            except AttributeError:
+                self._expand()
+                return slot.__get__(self)
+        return property(get)
+
+    x = _get(G1Point.x)
+    y = _get(G1Point.y)
+    z = _get(G1Point.z)
+    del _get
+
+    def affine(self):
+        if (self._affine == None):
+            self._expand()
+        return self._affine
+
+    #Pickles (e.g. for worker processes) as its compressed encoding
+    def __reduce__(self):
+        return (LazyG1Point, (self._compressed,))
+
+#Returns P as a LazyG1Point holding only its compressed encoding (NullPoint for the point at infinity)
+#Compressed points (int) and other values are returned unchanged
+def CompactPoint(P):
+    if (not is_point(P) or type(P) == LazyG1Point):
+        return P
+
+    Pc = CompressPoint(P)
+    if (Pc == 0):
+        return NullPoint
+
+    return LazyG1Point(Pc)
+
+#Compact Vectors
+#Key, L/R and signature vectors of the ring signature and proof objects are stored in one bytes
+#object each instead of as lists of (FQ, FQ, FQ) points or ints:
+#PointVector holds 32-byte compressed points (all zeros for the point at infinity), items are
+#returned as LazyG1Point objects and only decompressed when used.
+#ScalarVector holds 32-byte big endian scalars and can be written to.
+#Both index, iterate and slice (slices and "+" give lists) like the lists they replace.
+class PointVector:
+    __slots__ = ("data",)
+
+    def __init__(self, points=()):
+        if (type(points) == PointVector):
+            self.data = points.data
+            return
+
+        points = list(points)
+
+        #Normalize all uncompressed points with a single inversion
+        batch_affine([P for P in points if is_point(P) and type(P) != LazyG1Point])
+
+        self.data = b"".join(int(P._compressed if type(P) == LazyG1Point else CompressPoint(P)).to_bytes(32, "big") for P in points)
+
+    #Wraps encoded bytes (bytes, or a memoryview e.g. from the codec) without decoding or copying them
+    def FromBytes(data):
+        assert(len(data) % 32 == 0)
+        out = PointVector.__new__(PointVector)
+        out.data = data
+        return out
+
+    #Pickles (e.g. for worker processes) as a copy of its bytes
+    def __reduce__(self):
+        return (PointVector.FromBytes, (bytes(self.data),))
+
+    def Compressed(self, i):
+        return int.from_bytes(self.data[32*i:32*i+32], "big")
+
+    def __len__(self):
+        return len(self.data) // 32
+
+    def __getitem__(self, i):
+        if (type(i) == slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if (i < 0): i += len(self)
+        if (i < 0 or i >= len(self)): raise IndexError("PointVector index out of range")
+
+        Pc = self.Compressed(i)
+        if (Pc == 0):
+            return NullPoint
+
+        return LazyG1Point(Pc)
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield self[i]
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if (type(other) == list):
+            other = PointVector(other)
+        elif (type(other) != PointVector):
+            return NotImplemented
+        return self.data == other.data
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "PointVector(" + str([hex(self.Compressed(i)) for i in range(0, len(self))]) + ")"
+
+class ScalarVector:
+    __slots__ = ("data",)
+
+    def __init__(self, scalars=()):
+        if (type(scalars) == ScalarVector):
+            self.data = bytearray(scalars.data)
+        else:
+            self.data = bytearray(b"".join(int(x).to_bytes(32, "big") for x in scalars))
+
+    def FromBytes(data):
+        assert(len(data) % 32 == 0)
+        out = ScalarVector.__new__(ScalarVector)
+        out.data = bytearray(data)
+        return out
+
+    def __len__(self):
+        return len(self.data) // 32
+
+    def __getitem__(self, i):
+        if (type(i) == slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if (i < 0): i += len(self)
+        if (i < 0 or i >= len(self)): raise IndexError("ScalarVector index out of range")
+
+        return int.from_bytes(self.data[32*i:32*i+32], "big")
+
+    def __setitem__(self, i, x):
+        if (i < 0): i += len(self)
+        if (i < 0 or i >= len(self)): raise IndexError("ScalarVector index out of range")
+
+        self.data[32*i:32*i+32] = int(x).to_bytes(32, "big")
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield self[i]
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if (type(other) != list and type(other) != ScalarVector):
+            return NotImplemented
+        return list(self) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ScalarVector(" + str(list(self)) + ")"
+
+#Random Scalars
+#All scalars come from one buffered os.urandom() stream (see csprng.py).
+#SeedRandom(seed) switches it to a deterministic stream for benchmarks / test vectors only,
+#SeedRandom(None) switches back.
+_scalar_stream = ScalarStream(Ncurve)
+
+def SeedRandom(seed=None):
+    _scalar_stream.Seed(seed)
 
+def getRandom(count=1):
     if (count == 1):
-        out = (random.SystemRandom().getrandbits(254) % Ncurve)
+        out = _scalar_stream.Scalars(1)[0]
     else:
-        out = []
-        for i in range(0, count):
-            out = out + [random.SystemRandom().getrandbits(254) % Ncurve]
+        out = _scalar_stream.Scalars(count)
 
     return out
 
+#Like getRandom(), but always returns a list (also for count == 1)
+def getRandomVector(count):
+    return _scalar_stream.Scalars(count)
 
 def getRandomUnsafe(seed=None):
     import random
@@ -206,63 +565,98 @@ def ExpandCompressTest():
         else:
             print("Success!")
 
+#Precomputation Table Registry
+#wNAF tables of variable base points (ring members, key images, hash_to_point outputs...)
+#are kept keyed by the point's compressed encoding, so multiplying the same point again skips
+#building its table.  At most precompTableCacheSize tables are kept, least recently used first out.
+precompTableCacheSize = 256
+_precomp_tables = OrderedDict()
+_precomp_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_precomp_lock = threading.Lock()     #Used from several threads (e.g. NoncePool.FillBackground())
+
+#Returns the affine wNAF table [1, 3, 5, ...]*pt for the point with compressed encoding key
+#The table is built under the lock, so concurrent callers do not build it twice
+def GetPrecomputedTable(key, pt, wBits=5):
+    entry = (key, wBits)
+    with _precomp_lock:
+        P_pre = _precomp_tables.get(entry)
+        if (P_pre != None):
+            _precomp_stats["hits"] += 1
+            _precomp_tables.move_to_end(entry)
+            return P_pre
+
+        _precomp_stats["misses"] += 1
+        P_pre = _kernel.precompute(pt, wBits)
+        if (precompTableCacheSize > 0):
+            _precomp_tables[entry] = P_pre
+            while (len(_precomp_tables) > precompTableCacheSize):
+                _precomp_tables.popitem(last=False)
+                _precomp_stats["evictions"] += 1
+
+    return P_pre
+
+def PrecomputedTableStats():
+    with _precomp_lock:
+        stats = dict(_precomp_stats)
+        stats["size"] = len(_precomp_tables)
+
+    return stats
+
+def ClearPrecomputedTables():
+    with _precomp_lock:
+        _precomp_tables.clear()
+        for k in _precomp_stats:
+            _precomp_stats[k] = 0
+
 #Elliptic Curve Multiplication
+#multiply() and shamir() run on the integer kernel (curve_kernel.py, Jacobian coordinates)
+#and only convert to / from (FQ, FQ, FQ) tuples at their boundary
 if (useWindowed):
     def precompute_points(P, wBits=5):        
         #Calculate Precompiled Points: [1, 3, 5, ...]*P
-        wPowOver4 = 1 << (wBits-2)
-        P_pre = [None]*wPowOver4
-        P_pre[0] = P
-        P2 = double(P)
-        
-        for i in range(1, len(P_pre)):
-            P_pre[i] = add(P_pre[i-1], P2)
+        return [_kernel.from_affine(p) for p in _kernel.precompute(_kernel.to_raw(P), wBits)]
 
-        return P_pre
-    
-    G_pre = precompute_points(G1)
-    H_pre = precompute_points(H)
-    
     def multiply(P, s, wBits=5):
-        wPow = (1 << wBits)
-        wPowOver2 = wPow // 2
+        if (P[2] == 0):
+            return _kernel.from_raw(_kernel.INF)
+
+        (key, pt) = PointKey(P)
+
+        #Fixed generators use their fixed-base tables
+        name = _fixed_base_keys.get(key)
+        if (name == "G1"):
+            return MultiplyG1(s)
+        elif (name == "H"):
+            return MultiplyH(s)
 
-        if (eq(P, G1)):
-            P_pre = G_pre
-        elif (eq(P, H)):
-            P_pre = H_pre
+        P_pre = GetPrecomputedTable(key, pt, wBits)
+        if (useGLV):
+            return _kernel.from_raw(_kernel.multiply_glv(pt, s, P_pre, wBits))
         else:
-            P_pre = precompute_points(P, wBits)
-        
-        #Get NAF digits
-        dj = []
-        i = 0
-        while (s > 0):
-            if (s % 2) == 1:
-                d = s % wPow
-                if (d > wPowOver2):
-                    d = d - wPow
-                    
-                s -= d
-                
-                dj += [d]
-            else:
-                dj += [0]
-
-            s = s // 2
-            i = i + 1
-
-        Q = NullPoint
-        for j in reversed(range(0, i)):
-            Q = double(Q)
-            if (dj[j] > 0):
-                index = (dj[j] - 1) // 2
-                Q = add(Q, P_pre[index])
-            elif (dj[j] < 0):
-                index = (-dj[j] - 1) // 2
-                Q = add(Q, neg(P_pre[index]))
-            
-        return Q
+            return _kernel.from_raw(_kernel.multiply(pt, s, P_pre, wBits))
+
+    #Cross-checks multiply() (GLV or plain wNAF) against multiply_naive()
+    def GLV_SelfTest(N=20):
+        points = [G1, H, hash_to_point(H)]
+        scalars = [0, 1, 2, _kernel.LAMBDA, Ncurve-1, Ncurve, Ncurve+1, 2**127, 2**256-1] + getRandom(N)
+
+        passed = True
+        for i in range(0, len(scalars)):
+            P = points[i % len(points)]
+            if (not eq(multiply(P, scalars[i]), multiply_naive(P, scalars[i]))):
+                print("GLV Self Test[" + str(i) + "] failed! s = " + hex(scalars[i]))
+                passed = False
+
+        #Endomorphism: (BETA*x, y) == LAMBDA*(x, y)
+        P = normalize(hash_to_point(G1))
+        if (not eq(to_point(P[0].n * _kernel.BETA, P[1].n), multiply_naive(to_point(P[0].n, P[1].n), _kernel.LAMBDA))):
+            print("GLV Self Test: endomorphism check failed!")
+            passed = False
+
+        if (passed):
+            print("GLV Self Test passed!")
+
+        return passed
 
     def Multiply_TimeTrials(N=300):
         import time
@@ -291,6 +685,142 @@ else:
     def multiply(P, s):
         return multiply_naive(P, s)
 
+#Fixed-Base Multiplication
+#Signed-window tables for G1 and H (see curve_kernel.fixed_base_table) are built lazily on
+#first use, so s*G1 and s*H need only table additions and no doublings.
+#fixedBaseTableBudget bounds the memory used by each table and picks its window size.
+fixedBaseTableBudget = 1 << 20      #bytes per base point (default: 8-bit windows, ~0.85MB)
+fixedBaseTablePointSize = 200       #approximate bytes per affine table entry
+_fixed_tables = {}
+_fixed_tables_lock = threading.Lock()
+
+def FixedBaseWindowBits(budget=None):
+    if (budget == None):
+        budget = fixedBaseTableBudget
+
+    wBits = 2
+    while (wBits < 16):
+        size = _kernel.fixed_base_windows(wBits+1) * (1 << wBits) * fixedBaseTablePointSize
+        if (size > budget):
+            break
+
+        wBits = wBits + 1
+
+    return wBits
+
+#Changes the table budget, tables are rebuilt on next use
+def SetFixedBaseTableBudget(budget):
+    global fixedBaseTableBudget
+    with _fixed_tables_lock:
+        fixedBaseTableBudget = budget
+        _fixed_tables.clear()
+
+def GetFixedBaseTable(name):
+    entry = _fixed_tables.get(name)
+    if (entry != None):
+        return entry
+
+    #Built once, even if the first uses come from several threads
+    with _fixed_tables_lock:
+        entry = _fixed_tables.get(name)
+        if (entry == None):
+            if (name == "G1"):
+                base = G1
+            elif (name == "H"):
+                base = H
+            else:
+                raise KeyError(name)
+
+            wBits = FixedBaseWindowBits()
+            entry = (wBits, _kernel.fixed_base_table(_kernel.to_raw(base), wBits))
+            _fixed_tables[name] = entry
+
+    return entry
+
+#Compressed encodings of the fixed-base generators, multiply() routes them to their tables
+_fixed_base_keys = {CompressPoint(G1): "G1", CompressPoint(H): "H"}
+
+#Mirrors ECMath.MultiplyG1() / MultiplyH() / CommitG1H()
+def MultiplyG1(s):
+    (wBits, table) = GetFixedBaseTable("G1")
+    return _kernel.from_raw(_kernel.multiply_fixed(table, s, wBits))
+
+def MultiplyH(s):
+    (wBits, table) = GetFixedBaseTable("H")
+    return _kernel.from_raw(_kernel.multiply_fixed(table, s, wBits))
+
+#s_G1*G1 + s_H*H
+def CommitG1H(s_G1, s_H):
+    (wBitsG, tableG) = GetFixedBaseTable("G1")
+    (wBitsH, tableH) = GetFixedBaseTable("H")
+    Q = _kernel.multiply_fixed(tableG, s_G1, wBitsG)
+    Q = _kernel.multiply_fixed(tableH, s_H, wBitsH, Q)
+    return _kernel.from_raw(Q)
+
+#Base 4 Digit Table
+#Row i holds k*(4^i)*H for k = -3 ... 3 (at index k+3, NullPoint for k = 0), so the commitment to a
+#base 4 digit at position i and its counter commitments (see PCRangeProof) take one point addition
+#each instead of an H multiplication.  Rows are built on first use, each from the one before it by
+#two doublings, normalized together and shared by all proofs.
+_digit_table = []
+_digit_table_lock = threading.Lock()
+
+def GetDigitTable(i):
+    with _digit_table_lock:
+        while (len(_digit_table) <= i):
+            if (len(_digit_table) == 0):
+                P = H
+            else:
+                P = double(double(_digit_table[-1][4]))
+
+            P2 = double(P)
+            row = [P, P2, add(P2, P)]
+            row = [g1point_from_affine(x, y) for (x, y) in batch_affine(row)]
+            _digit_table.append([neg(row[2]), neg(row[1]), neg(row[0]), NullPoint] + row)
+
+        return _digit_table[i]
+
+def ClearDigitTable():
+    with _digit_table_lock:
+        _digit_table.clear()
+
+#s_G1*G1 + s_P*P (ring segments): the wNAF doubling chain for P is the only chain,
+#the G1 part is accumulated onto it with fixed-base table additions
+def CommitG1P(s_G1, P, s_P):
+    (wBits, table) = GetFixedBaseTable("G1")
+    if (P[2] == 0):
+        Q = _kernel.INF
+    else:
+        (key, pt) = PointKey(P)
+        P_pre = GetPrecomputedTable(key, pt)
+        if (useGLV):
+            Q = _kernel.multiply_glv(pt, s_P, P_pre)
+        else:
+            Q = _kernel.multiply(pt, s_P, P_pre)
+
+    Q = _kernel.multiply_fixed(table, s_G1, wBits, Q)
+    return _kernel.from_raw(Q)
+
+#sum(s[i]*P[i]) for a few points that recur between calls (key images, Hp(P) of ring members):
+#each point's wNAF table comes from the registry (see GetPrecomputedTable) instead of being rebuilt
+def MultiexpPrecomputed(P, s):
+    assert(len(P) == len(s))
+
+    tables = []
+    scalars = []
+    for i in range(0, len(P)):
+        k = s[i] % Ncurve
+        if (P[i][2] == 0 or k == 0): continue
+
+        (key, pt) = PointKey(P[i])
+        tables += [GetPrecomputedTable(key, pt)]
+        scalars += [k]
+
+    if (len(tables) == 0):
+        return _kernel.from_raw(_kernel.INF)
+
+    return _kernel.from_raw(_kernel.straus_precomputed(tables, scalars))
+
 #shamir2 and shamir 3 are variations on multiply() using Shamir's Trick - Multiexponentiation
 def find_msb(s):
     x = (1 << 255)
@@ -307,44 +837,18 @@ if (useShamir):
         if (b == 1):
             return multiply(P[0], s[0])
 
-        points = [NullPoint]*(2**b-1)
-
-        bit = 1
-        for i in range(0, b):
-            for j in range(1, len(points)+1):
-                if ((j & bit) > 0):
-                    points[j-1] = add(points[j-1], P[i])
-
-            bit = bit << 1
-
-        x = find_msb(max(s))
-        Pout = NullPoint
-
-        while (x > 0):
-            Pout = double(Pout)
-
-            i = 0
-            bit = 1
-            for j in range(0, b):
-                if ((x & s[j]) > 0):
-                    i = i + bit
+        return multiexp(P, s)
 
-                bit = bit << 1
-
-            if (i > 0):
-                Pout = add(Pout, points[i-1])
-                    
-            x = x >> 1
-
-        return Pout
+    #sum(s[i]*P[i]) for any number of points (Straus or Pippenger, see curve_kernel.multiexp)
+    def multiexp(P, s):
+        assert(len(P) == len(s))
+        return _kernel.from_raw(_kernel.multiexp([_kernel.to_raw(p) for p in P], s))
 
     def Shamir_TimeTrials(N=100, n=2):
         import time
 
         #Pick random Numbers
-        r = []
-        for i in range(0, N):
-            r = r + [getRandom(n)]
+        r = [getRandomVector(n) for i in range(0, N)]
 
         #Get generator points
         G = [G1] + [NullPoint]*(n-1)
@@ -382,3 +886,12 @@ else:
             Pout = add(Pout, multiply(P[i], s[i]))
             
         return Pout
+
+    def multiexp(P, s):
+        assert(len(P) == len(s))
+
+        Pout = NullPoint
+        for i in range(0, len(P)):
+            Pout = add(Pout, multiply(P[i], s[i]))
+
+        return Pout